@@ -14,6 +14,19 @@ async function apiGet(path) {
   if (!r.ok) throw new Error(await r.text());
   return r.json();
 }
+// Segue o header X-Proximo-Cursor até a última página (listagem por keyset)
+async function apiGetTodasPaginas(path) {
+  const itens = [];
+  let cursor = null;
+  do {
+    const sep = path.includes("?") ? "&" : "?";
+    const r = await fetch(`${API_BASE}${path}${cursor ? `${sep}apos=${encodeURIComponent(cursor)}` : ""}`);
+    if (!r.ok) throw new Error(await r.text());
+    itens.push(...(await r.json()));
+    cursor = r.headers.get("X-Proximo-Cursor");
+  } while (cursor);
+  return itens;
+}
 async function apiPost(path, body) {
   const r = await fetch(`${API_BASE}${path}`, {
     method: "POST",
@@ -52,7 +65,7 @@ export default function AnimaisAbrigo({ abrigoId }) {
   const carregar = useCallback(async () => {
     setCarregando(true);
     try {
-      setAnimais(await apiGet(`/abrigos/${abrigoId}/animais`));
+      setAnimais(await apiGetTodasPaginas(`/abrigos/${abrigoId}/animais`));
     } finally {
       setCarregando(false);
     }
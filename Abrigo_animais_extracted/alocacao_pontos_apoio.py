@@ -0,0 +1,123 @@
+"""
+Atribuição em lote de animais a pontos de apoio (evacuação em massa).
+
+Problema de transporte: cada animal vai para no máximo um ponto
+compatível, cada ponto recebe no máximo `capacidade` animais, e a soma
+das distâncias é a menor possível entre as atribuições com o maior
+número de animais atendidos.
+
+Resolvido por caminhos mínimos sucessivos (min-cost max-flow): a cada
+passo, o animal ainda sem ponto cujo caminho de aumento é o mais barato
+entra na solução. Como os pontos são poucos (dezenas) e os animais muitos
+(milhares), o grafo residual é comprimido sobre os pontos: a entrada em p
+custa a menor distância de um animal pendente até p (heap por ponto), e a
+aresta p → q custa o menor acréscimo de distância para transferir algum
+animal hoje em p para q (heap por par). Cada passo é então um Dijkstra
+O(N²) sobre N pontos com potenciais (custos reduzidos não negativos), em
+vez de uma busca sobre todos os animais — e o resultado continua exato:
+uma chegada posterior pode "empurrar" um animal já atribuído para o
+segundo ponto mais próximo, se isso reduzir o total.
+
+Sem dependências do app — só índices e custos —, para poder ser testado
+isoladamente (ver scripts/benchmark_pontos_apoio.py).
+"""
+from __future__ import annotations
+
+import heapq
+from typing import List, Optional, Sequence, Tuple
+
+INF = float("inf")
+
+
+def atribuir_min_distancia(
+    candidatos: Sequence[Sequence[Tuple[int, float]]], capacidades: Sequence[int]
+) -> List[Optional[int]]:
+    """candidatos[i] = [(ponto, distancia), ...] só com os pontos
+    compatíveis com o animal i; capacidades[p] = vagas do ponto p.
+
+    Retorna, para cada animal, o índice do ponto atribuído ou None quando
+    não há vaga compatível alcançável."""
+    n = len(capacidades)
+    atribuido: List[Optional[int]] = [None] * len(candidatos)
+    custo = [dict(c) for c in candidatos]
+    ocupacao = [0] * n
+    # pendentes[p]: (distância, i) dos animais ainda sem ponto, compatíveis com p
+    pendentes = [[] for _ in range(n)]
+    for i, ci in enumerate(custo):
+        for p, c in ci.items():
+            pendentes[p].append((c, i))
+    for h in pendentes:
+        heapq.heapify(h)
+    # heaps[p][q]: (acréscimo c[j][q] - c[j][p], j) dos animais j em p;
+    # entradas de animais que já saíram de p são descartadas na leitura
+    heaps = [dict() for _ in range(n)]
+    pi = [0.0] * n  # potenciais dos pontos
+    pi_t = 0.0      # potencial do sumidouro
+
+    def _colocar(j: int, p: int) -> None:
+        atribuido[j] = p
+        cj = custo[j]
+        base = cj[p]
+        hp = heaps[p]
+        for q, c in cj.items():
+            if q != p:
+                heapq.heappush(hp.setdefault(q, []), (c - base, j))
+
+    def _topo(p: int, q: int):
+        h = heaps[p].get(q)
+        while h and atribuido[h[0][1]] != p:
+            heapq.heappop(h)
+        return h[0] if h else None
+
+    while True:
+        dist = [INF] * n
+        # pred[q]: (None, animal pendente que entra) ou (ponto anterior, animal transferido)
+        pred: List[Optional[Tuple[object, int]]] = [None] * n
+        for p in range(n):
+            h = pendentes[p]
+            while h and atribuido[h[0][1]] is not None:
+                heapq.heappop(h)
+            if h:
+                dist[p], pred[p] = h[0][0] - pi[p], (None, h[0][1])
+
+        fechado = [False] * n
+        d_t, fim = INF, None
+        while True:
+            p, d_p = None, INF
+            for x in range(n):
+                if not fechado[x] and dist[x] < d_p:
+                    p, d_p = x, dist[x]
+            if p is None or d_p >= d_t:
+                break
+            fechado[p] = True
+            if ocupacao[p] < capacidades[p]:
+                d = d_p + pi[p] - pi_t
+                if d < d_t:
+                    d_t, fim = d, p
+            for q in heaps[p]:
+                if fechado[q]:
+                    continue
+                topo = _topo(p, q)
+                if topo is None:
+                    continue
+                d = d_p + topo[0] + pi[p] - pi[q]
+                if d < dist[q]:
+                    dist[q], pred[q] = d, (p, topo[1])
+
+        if fim is None:
+            break  # nenhum animal pendente alcança vaga compatível
+
+        for x in range(n):
+            pi[x] += min(dist[x], d_t)
+        pi_t += d_t
+
+        ocupacao[fim] += 1
+        q = fim
+        while True:
+            p, j = pred[q]
+            _colocar(j, q)
+            if p is None:
+                break
+            q = p
+
+    return atribuido
@@ -17,6 +17,8 @@ class PontoApoioAnimalIn(BaseModel):
     longitude: float
     capacidade_maxima: int
     telefone_contato: Optional[str] = None
+    especies_aceitas: Optional[List[str]] = None  # None = qualquer espécie
+    portes_aceitos: Optional[List[str]] = None    # None = qualquer porte
 
 
 class PontoApoioAnimalOut(BaseModel):
@@ -28,6 +30,8 @@ class PontoApoioAnimalOut(BaseModel):
     longitude: float
     capacidade_maxima: int
     telefone_contato: Optional[str] = None
+    especies_aceitas: Optional[List[str]] = None
+    portes_aceitos: Optional[List[str]] = None
 
     class Config:
         orm_mode = True
@@ -37,6 +41,7 @@ class PontoApoioComDisponibilidadeOut(PontoApoioAnimalOut):
     ocupacao_atual: int
     vagas_disponiveis: int
     distancia_km: Optional[float] = None
+    distancia_tipo: Optional[str] = None  # 'viaria' | 'linha_reta' | None (sem distância)
 
 
 class SugestaoPontosApoioOut(BaseModel):
@@ -92,6 +97,10 @@ class AnimalOut(BaseModel):
         orm_mode = True
 
 
+class AnimalReencontroOut(AnimalOut):
+    score: float  # 1.0 = microchip ou descrição idênticos
+
+
 class EncaminharAnimalIn(BaseModel):
     ponto_apoio_id: UUID
     observacao: Optional[str] = None
@@ -101,3 +110,32 @@ class EncaminharAnimalIn(BaseModel):
 class AtualizarStatusEncaminhamentoIn(BaseModel):
     status: str = Field(..., description="'no_local' | 'devolvido_ao_tutor' | 'obito'")
     observacao: Optional[str] = None
+
+
+class EncaminharLoteIn(BaseModel):
+    """Informe exatamente um: abrigo_humano_id ou municipio_id."""
+    abrigo_humano_id: Optional[UUID] = None
+    municipio_id: Optional[UUID] = None
+    observacao: Optional[str] = None
+    simular: bool = False
+
+
+class EncaminhamentoLoteItemOut(BaseModel):
+    animal_id: UUID
+    animal_nome: str
+    ponto_apoio_id: UUID
+    ponto_apoio_nome: str
+    distancia_km: Optional[float] = None
+
+
+class AnimalNaoAtribuidoOut(BaseModel):
+    animal_id: UUID
+    animal_nome: str
+    motivo: str
+
+
+class EncaminhamentoLoteOut(BaseModel):
+    simulacao: bool
+    distancia_total_km: float
+    atribuidos: List[EncaminhamentoLoteItemOut]
+    nao_atribuidos: List[AnimalNaoAtribuidoOut]
@@ -3,12 +3,18 @@ AnimalAbrigoService
 
 Responsabilidades:
 1. Cadastro do animal de estimação vinculado ao tutor (pessoa abrigada).
-2. Cálculo de distância (Haversine) entre a referência de localização do
-   tutor e os pontos de apoio animal disponíveis, para sugerir sempre o
-   mais próximo com vaga.
+2. Cálculo de distância entre a referência de localização do tutor e os
+   pontos de apoio animal disponíveis — pela malha viária pré-calculada
+   quando disponível, senão em linha reta (Haversine) —, para sugerir
+   sempre o mais próximo com vaga.
 3. Encaminhamento do animal a um ponto de apoio (área dentro do próprio
    abrigo, canil municipal, CCZ ou ONG parceira) e acompanhamento do
    status até eventual devolução ao tutor.
+4. Busca de animais em todos os abrigos para o reencontro com o tutor
+   (microchip exato ou descrição aproximada).
+5. Encaminhamento em lote (evacuação em massa): todos os animais ainda
+   sem ponto de um abrigo ou município distribuídos de uma vez, com a
+   menor distância total que respeita vagas, espécie e porte.
 
 Referência de localização usada para "proximidade ao tutor": preferencialmente
 o endereço residencial de origem do abrigado (campo já deve existir no
@@ -18,12 +24,17 @@ a localização do próprio abrigo humano como aproximação razoável.
 """
 from __future__ import annotations
 
-import math
+import base64
+import time
 from datetime import datetime
+from collections import Counter
+from itertools import chain, islice
 from typing import List, Optional
 from uuid import UUID
 
 from fastapi import HTTPException, status
+from sqlalchemy import and_, event, func, text, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.abrigo import Abrigo
@@ -32,15 +43,105 @@ from app.models.animal_abrigo import (
     AnimalEstimacao, AnimalEncaminhamento, PontoApoioAnimal,
     StatusEncaminhamentoAnimal,
 )
-
-
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    raio_terra_km = 6371.0
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    d_phi = math.radians(lat2 - lat1)
-    d_lambda = math.radians(lon2 - lon1)
-    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
-    return raio_terra_km * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+from app.services.alocacao_pontos_apoio import atribuir_min_distancia
+from app.services.distancias import haversine_km as _haversine_km, matriz_distancias_km
+from app.services.distancias_viarias import chave_origem, coordenadas_da_origem
+from app.services.eventos_pontos_apoio import barramento_pontos_apoio
+from app.services.indice_animais import IndiceAnimais
+from app.services.indice_pontos_apoio import IndicePontosApoio
+
+
+# Coordenadas de referência (tutor/abrigo) mudam raramente — geocodificação
+# do endereço ou abrigo movido — e são lidas para cada animal de cada
+# família. Ficam num cache por processo com validade curta (para pegar
+# também alterações feitas direto pelo app) e num memo por sessão (request).
+REFERENCIA_TTL_S = 300
+_COORDENADAS_TUTOR = {}   # tutor_pessoa_id -> (instante, (lat, lon) | None)
+_COORDENADAS_ABRIGO = {}  # abrigo_id -> (instante, (lat, lon) | None)
+
+
+def invalidar_cache_coordenadas(tutor_id: Optional[UUID] = None, abrigo_id: Optional[UUID] = None) -> None:
+    """Sem argumentos, descarta tudo."""
+    if tutor_id is None and abrigo_id is None:
+        _COORDENADAS_TUTOR.clear()
+        _COORDENADAS_ABRIGO.clear()
+        return
+    if tutor_id is not None:
+        _COORDENADAS_TUTOR.pop(tutor_id, None)
+    if abrigo_id is not None:
+        _COORDENADAS_ABRIGO.pop(abrigo_id, None)
+
+
+def _coordenadas_em_cache(cache: dict, ids) -> tuple:
+    """Separa ids com entrada válida no cache ({id: coords}) dos que faltam."""
+    agora = time.monotonic()
+    encontrados, faltando = {}, set()
+    for chave in ids:
+        entrada = cache.get(chave)
+        if entrada is not None and agora - entrada[0] <= REFERENCIA_TTL_S:
+            encontrados[chave] = entrada[1]
+        else:
+            faltando.add(chave)
+    return encontrados, faltando
+
+
+def _coordenadas_tutores(db: Session, tutor_ids) -> dict:
+    """{tutor_pessoa_id: (lat, lon) | None}, com uma consulta (IN) só para quem não está em cache."""
+    encontrados, faltando = _coordenadas_em_cache(_COORDENADAS_TUTOR, tutor_ids)
+    if faltando:
+        lidos = {
+            t_id: (float(lat), float(lon)) if lat and lon else None
+            for t_id, lat, lon in db.query(
+                PessoaAbrigada.id, PessoaAbrigada.endereco_latitude, PessoaAbrigada.endereco_longitude
+            ).filter(PessoaAbrigada.id.in_(faltando))
+        }
+        agora = time.monotonic()
+        for t_id in faltando:
+            encontrados[t_id] = lidos.get(t_id)
+            _COORDENADAS_TUTOR[t_id] = (agora, encontrados[t_id])
+    return encontrados
+
+
+def _coordenadas_abrigos(db: Session, abrigo_ids) -> dict:
+    """{abrigo_id: (lat, lon) | None}, com uma consulta (IN) só para quem não está em cache."""
+    encontrados, faltando = _coordenadas_em_cache(_COORDENADAS_ABRIGO, abrigo_ids)
+    if faltando:
+        lidos = {
+            a_id: (float(lat), float(lon)) if lat is not None and lon is not None else None
+            for a_id, lat, lon in db.query(Abrigo.id, Abrigo.latitude, Abrigo.longitude)
+            .filter(Abrigo.id.in_(faltando))
+        }
+        agora = time.monotonic()
+        for a_id in faltando:
+            encontrados[a_id] = lidos.get(a_id)
+            _COORDENADAS_ABRIGO[a_id] = (agora, encontrados[a_id])
+    return encontrados
+
+
+def _referencias_localizacao(db: Session, animais: List[AnimalEstimacao]) -> dict:
+    """(latitude, longitude, origem) de referência de cada animal, pela
+    regra de _referencia_localizacao_tutor: {animal_id: (lat, lon, origem)}.
+
+    Memo por sessão (uma request) por (tutor, abrigo): os animais de uma
+    mesma família custam uma única busca; o que faltar sai do cache do
+    processo ou, em último caso, de duas consultas IN (tutores e abrigos)."""
+    memo = db.info.setdefault("referencias_localizacao", {})
+    pendentes = [a for a in animais if (a.tutor_pessoa_id, a.abrigo_humano_id) not in memo]
+    if pendentes:
+        tutores = _coordenadas_tutores(db, {a.tutor_pessoa_id for a in pendentes})
+        abrigos = {}
+        sem_tutor = {a.abrigo_humano_id for a in pendentes if tutores.get(a.tutor_pessoa_id) is None}
+        if sem_tutor:
+            abrigos = _coordenadas_abrigos(db, sem_tutor)
+        for a in pendentes:
+            if tutores.get(a.tutor_pessoa_id) is not None:
+                referencia = (*tutores[a.tutor_pessoa_id], "endereco_tutor")
+            elif abrigos.get(a.abrigo_humano_id) is not None:
+                referencia = (*abrigos[a.abrigo_humano_id], "abrigo")
+            else:
+                referencia = (None, None, "indisponivel")
+            memo[(a.tutor_pessoa_id, a.abrigo_humano_id)] = referencia
+    return {a.id: memo[(a.tutor_pessoa_id, a.abrigo_humano_id)] for a in animais}
 
 
 def _referencia_localizacao_tutor(
@@ -61,15 +162,35 @@ def _referencia_localizacao_tutor(
     significa que a ordenação por proximidade não poderá ser aplicada, e
     quem chamou esta função deve tratar esse caso (ver
     sugerir_pontos_por_proximidade / encaminhar_animal)."""
-    tutor = db.query(PessoaAbrigada).get(animal.tutor_pessoa_id)
-    if tutor is not None and tutor.endereco_latitude and tutor.endereco_longitude:
-        return float(tutor.endereco_latitude), float(tutor.endereco_longitude), "endereco_tutor"
+    return _referencias_localizacao(db, [animal])[animal.id]
+
+
+def _registrar_invalidacoes_coordenadas():
+    """Descarta as coordenadas em cache de tutores e abrigos alterados por
+    este processo (endereço geocodificado, abrigo movido) ao commitar."""
+
+    @event.listens_for(Session, "after_flush")
+    def _marcar_alteracoes(session, flush_context):
+        for obj in chain(session.dirty, session.deleted):
+            if isinstance(obj, PessoaAbrigada):
+                session.info.setdefault("coordenadas_alteradas", set()).add((obj.id, None))
+            elif isinstance(obj, Abrigo):
+                session.info.setdefault("coordenadas_alteradas", set()).add((None, obj.id))
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidar_alteracoes(session):
+        alteradas = session.info.pop("coordenadas_alteradas", ())
+        if alteradas:
+            session.info.pop("referencias_localizacao", None)
+        for tutor_id, abrigo_id in alteradas:
+            invalidar_cache_coordenadas(tutor_id, abrigo_id)
+
+    @event.listens_for(Session, "after_rollback")
+    def _descartar_alteracoes(session):
+        session.info.pop("coordenadas_alteradas", None)
 
-    abrigo = db.query(Abrigo).get(animal.abrigo_humano_id)
-    if abrigo is not None and abrigo.latitude is not None and abrigo.longitude is not None:
-        return float(abrigo.latitude), float(abrigo.longitude), "abrigo"
 
-    return None, None, "indisponivel"
+_registrar_invalidacoes_coordenadas()
 
 
 # ---------------------------------------------------------------------
@@ -87,37 +208,352 @@ def cadastrar_animal(db: Session, abrigo_humano_id: UUID, dados: dict) -> Animal
     return animal
 
 
-def listar_animais_do_abrigo(db: Session, abrigo_humano_id: UUID) -> List[AnimalEstimacao]:
+STATUS_SEM_ENCAMINHAMENTO = "sem_encaminhamento"
+
+
+def _cursor_animal(animal: AnimalEstimacao) -> str:
+    """(created_at, id) do último item da página, em base64 para ir na URL sem escape."""
+    return base64.urlsafe_b64encode(f"{animal.created_at.isoformat()}|{animal.id}".encode()).decode()
+
+
+def _ler_cursor_animal(cursor: str) -> tuple:
+    try:
+        created_at, animal_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), UUID(animal_id)
+    except ValueError:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, "Cursor de paginação inválido.")
+
+
+def _consulta_animais_com_encaminhamento(db: Session):
+    """(animal, encaminhamento ativo | None, nome do ponto | None) numa só consulta."""
     return (
-        db.query(AnimalEstimacao)
-        .filter(AnimalEstimacao.abrigo_humano_id == abrigo_humano_id, AnimalEstimacao.ativo.is_(True))
-        .order_by(AnimalEstimacao.created_at)
-        .all()
+        db.query(AnimalEstimacao, AnimalEncaminhamento, PontoApoioAnimal.nome)
+        .outerjoin(
+            AnimalEncaminhamento,
+            and_(AnimalEncaminhamento.animal_id == AnimalEstimacao.id, AnimalEncaminhamento.ativo.is_(True)),
+        )
+        .outerjoin(PontoApoioAnimal, PontoApoioAnimal.id == AnimalEncaminhamento.ponto_apoio_id)
+    )
+
+
+def listar_animais_do_abrigo(
+    db: Session, abrigo_humano_id: UUID, status_encaminhamento: Optional[str] = None,
+    apos: Optional[str] = None, limite: int = 500,
+) -> dict:
+    """Animais ativos do abrigo com o encaminhamento ativo e o nome do
+    ponto de apoio, numa única consulta (LEFT JOIN) — nada é carregado
+    depois, animal a animal.
+
+    Paginação por keyset em (created_at, id): `apos` é o cursor devolvido
+    em `proximo_cursor` pela página anterior (None na última página).
+    status_encaminhamento filtra pelo status do encaminhamento ativo
+    ('encaminhado', 'no_local', ...) ou 'sem_encaminhamento'.
+
+    Retorna {"itens": [(animal, encaminhamento | None, ponto_apoio_nome | None)],
+    "proximo_cursor": str | None}."""
+    consulta = _consulta_animais_com_encaminhamento(db).filter(
+        AnimalEstimacao.abrigo_humano_id == abrigo_humano_id, AnimalEstimacao.ativo.is_(True)
+    )
+    if status_encaminhamento == STATUS_SEM_ENCAMINHAMENTO:
+        consulta = consulta.filter(AnimalEncaminhamento.id.is_(None))
+    elif status_encaminhamento is not None:
+        try:
+            consulta = consulta.filter(
+                AnimalEncaminhamento.status == StatusEncaminhamentoAnimal(status_encaminhamento)
+            )
+        except ValueError:
+            raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, f"Status inválido: '{status_encaminhamento}'.")
+    if apos is not None:
+        consulta = consulta.filter(tuple_(AnimalEstimacao.created_at, AnimalEstimacao.id) > _ler_cursor_animal(apos))
+
+    linhas = consulta.order_by(AnimalEstimacao.created_at, AnimalEstimacao.id).limit(limite + 1).all()
+    proximo = _cursor_animal(linhas[limite - 1][0]) if len(linhas) > limite else None
+    return {"itens": linhas[:limite], "proximo_cursor": proximo}
+
+
+# ---------------------------------------------------------------------
+# Reencontro: busca de animais em todos os abrigos
+# ---------------------------------------------------------------------
+_INDICE_ANIMAIS: Optional[IndiceAnimais] = None
+_ASSINATURA_INDICE_ANIMAIS = None
+
+
+def _obter_indice_animais(db: Session) -> IndiceAnimais:
+    """Índice de todos os animais ativos, mantido por processo. A
+    assinatura (ativos, último updated_at) é conferida a cada busca, então
+    um animal cadastrado, editado ou baixado por qualquer caminho —
+    inclusive direto no app — aparece na busca seguinte."""
+    global _INDICE_ANIMAIS, _ASSINATURA_INDICE_ANIMAIS
+    assinatura = tuple(
+        db.query(
+            func.count(AnimalEstimacao.id).filter(AnimalEstimacao.ativo.is_(True)),
+            func.max(AnimalEstimacao.updated_at),
+        ).one()
     )
+    if _INDICE_ANIMAIS is None or assinatura != _ASSINATURA_INDICE_ANIMAIS:
+        _INDICE_ANIMAIS = IndiceAnimais(
+            db.query(
+                AnimalEstimacao.id, AnimalEstimacao.abrigo_humano_id, Abrigo.municipio_id,
+                AnimalEstimacao.microchip_numero, AnimalEstimacao.especie, AnimalEstimacao.porte,
+                AnimalEstimacao.sexo, AnimalEstimacao.nome, AnimalEstimacao.raca,
+                AnimalEstimacao.temperamento_observacoes, AnimalEstimacao.condicao_saude_observacoes,
+            )
+            .outerjoin(Abrigo, Abrigo.id == AnimalEstimacao.abrigo_humano_id)
+            .filter(AnimalEstimacao.ativo.is_(True))
+            .all()
+        )
+        _ASSINATURA_INDICE_ANIMAIS = assinatura
+    return _INDICE_ANIMAIS
+
+
+def buscar_animais_para_reencontro(
+    db: Session, microchip: Optional[str] = None, texto: Optional[str] = None,
+    especie: Optional[str] = None, porte: Optional[str] = None, sexo: Optional[str] = None,
+    municipio_id: Optional[UUID] = None, abrigo_humano_id: Optional[UUID] = None, limite: int = 20,
+) -> List[tuple]:
+    """Procura o animal em todos os abrigos (do município, se informado).
+
+    Com `microchip`, a busca é exata pelo número (ignorando pontuação) e
+    os demais critérios são ignorados. Sem ele, candidatos dos blocos
+    (espécie, porte, sexo) compatíveis, ordenados pela semelhança de
+    `texto` com nome/raça/observações.
+
+    Retorna [(animal, encaminhamento | None, ponto_apoio_nome | None, score)],
+    do mais para o menos parecido."""
+    if not microchip and not (texto or especie or porte or sexo):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "Informe o microchip ou ao menos um critério de descrição (texto, espécie, porte, sexo).",
+        )
+    indice = _obter_indice_animais(db)
+    if microchip:
+        encontrados = [(a, 1.0) for a in indice.por_microchip(microchip, abrigo_humano_id, municipio_id)]
+    else:
+        encontrados = indice.buscar(texto, especie, porte, sexo, abrigo_humano_id, municipio_id, limite)
+    if not encontrados:
+        return []
+
+    scores = dict(encontrados)
+    linhas = _consulta_animais_com_encaminhamento(db).filter(AnimalEstimacao.id.in_(list(scores))).all()
+    resultado = [(a, enc, ponto_nome, scores[a.id]) for a, enc, ponto_nome in linhas]
+    resultado.sort(key=lambda r: -r[3])
+    return resultado
 
 
 # ---------------------------------------------------------------------
 # Sugestão de pontos de apoio por proximidade + vaga
 # ---------------------------------------------------------------------
-def _ocupacao_atual(db: Session, ponto_apoio_id: UUID) -> int:
-    return (
-        db.query(AnimalEncaminhamento)
+_STATUS_OCUPANDO_VAGA = [StatusEncaminhamentoAnimal.ENCAMINHADO, StatusEncaminhamentoAnimal.NO_LOCAL]
+
+
+def _ocupacao_por_ponto(db: Session) -> dict:
+    """Ocupação real de todos os pontos de apoio, contada a partir dos
+    encaminhamentos numa única consulta (GROUP BY ponto_apoio_id) — fonte
+    de verdade usada na reconciliação do contador. Pontos sem nenhum
+    animal não aparecem no dicionário — use .get(ponto_id, 0)."""
+    return dict(
+        db.query(AnimalEncaminhamento.ponto_apoio_id, func.count(AnimalEncaminhamento.id))
         .filter(
-            AnimalEncaminhamento.ponto_apoio_id == ponto_apoio_id,
             AnimalEncaminhamento.ativo.is_(True),
-            AnimalEncaminhamento.status.in_([
-                StatusEncaminhamentoAnimal.ENCAMINHADO, StatusEncaminhamentoAnimal.NO_LOCAL,
-            ]),
+            AnimalEncaminhamento.status.in_(_STATUS_OCUPANDO_VAGA),
         )
-        .count()
+        .group_by(AnimalEncaminhamento.ponto_apoio_id)
+        .all()
     )
 
 
+def reconciliar_ocupacao_pontos(db: Session) -> List[dict]:
+    """Confere o contador ocupacao_atual de cada ponto de apoio com a
+    contagem real dos encaminhamentos e corrige as divergências. Job
+    periódico de segurança — em operação normal o trigger mantém o
+    contador exato e a lista retornada vem vazia.
+
+    Os pontos são travados antes da contagem, para que nenhuma transição
+    (que atualiza o mesmo registro via trigger) entre no meio."""
+    pontos = db.query(PontoApoioAnimal).order_by(PontoApoioAnimal.id).with_for_update().all()
+    reais = _ocupacao_por_ponto(db)
+
+    divergencias = []
+    for p in pontos:
+        real = reais.get(p.id, 0)
+        if p.ocupacao_atual != real:
+            divergencias.append({"ponto_apoio_id": p.id, "contador": p.ocupacao_atual, "real": real})
+            p.ocupacao_atual = real
+
+    db.commit()
+    _publicar_ocupacao(db, [d["ponto_apoio_id"] for d in divergencias])
+    return divergencias
+
+
+def estado_ocupacao_pontos(db: Session, ponto_ids=None) -> List[dict]:
+    """Ocupação/vaga dos pontos (todos os ativos, ou os ponto_ids
+    informados, mesmo inativos) numa consulta, no formato dos eventos do
+    stream de ocupação."""
+    consulta = db.query(
+        PontoApoioAnimal.id, PontoApoioAnimal.nome, PontoApoioAnimal.tipo,
+        PontoApoioAnimal.ocupacao_atual, PontoApoioAnimal.capacidade_maxima, PontoApoioAnimal.ativo,
+    )
+    if ponto_ids is None:
+        consulta = consulta.filter(PontoApoioAnimal.ativo.is_(True))
+    else:
+        consulta = consulta.filter(PontoApoioAnimal.id.in_(list(ponto_ids)))
+    return [
+        {
+            "ponto_apoio_id": str(ponto_id), "nome": nome, "tipo": _valor(tipo),
+            "ocupacao_atual": ocupacao, "capacidade_maxima": capacidade, "ativo": ativo,
+        }
+        for ponto_id, nome, tipo, ocupacao, capacidade, ativo in consulta
+    ]
+
+
+def _publicar_ocupacao(db: Session, ponto_ids) -> None:
+    """Publica no stream a ocupação já commitada dos pontos alterados
+    (substituto do NOTIFY quando não há LISTEN; duplicatas são filtradas
+    por conexão)."""
+    ponto_ids = {pid for pid in ponto_ids if pid is not None}
+    if ponto_ids:
+        for evento in estado_ocupacao_pontos(db, ponto_ids):
+            barramento_pontos_apoio.publicar(evento)
+
+
+_INDICE_PONTOS: Optional[IndicePontosApoio] = None
+_ASSINATURA_INDICE_PONTOS = None
+_LOTE_CANDIDATOS = 32
+
+
+def invalidar_indice_pontos() -> None:
+    """Força a reconstrução do índice espacial na próxima consulta."""
+    global _INDICE_PONTOS, _ASSINATURA_INDICE_PONTOS
+    _INDICE_PONTOS, _ASSINATURA_INDICE_PONTOS = None, None
+
+
+def _obter_indice_pontos(db: Session) -> IndicePontosApoio:
+    """Índice espacial dos pontos ativos com coordenadas, mantido por
+    processo. A assinatura (quantidade, último updated_at) é conferida a
+    cada uso, então pontos criados, movidos ou (in)ativados por qualquer
+    caminho — inclusive direto no app — disparam a reconstrução."""
+    global _INDICE_PONTOS, _ASSINATURA_INDICE_PONTOS
+    com_coordenadas = (
+        PontoApoioAnimal.ativo.is_(True),
+        PontoApoioAnimal.latitude.isnot(None),
+        PontoApoioAnimal.longitude.isnot(None),
+    )
+    assinatura = tuple(
+        db.query(func.count(PontoApoioAnimal.id), func.max(PontoApoioAnimal.updated_at))
+        .filter(*com_coordenadas)
+        .one()
+    )
+    if _INDICE_PONTOS is None or assinatura != _ASSINATURA_INDICE_PONTOS:
+        _INDICE_PONTOS = IndicePontosApoio(
+            db.query(PontoApoioAnimal.id, PontoApoioAnimal.latitude, PontoApoioAnimal.longitude)
+            .filter(*com_coordenadas)
+            .all()
+        )
+        _ASSINATURA_INDICE_PONTOS = assinatura
+    return _INDICE_PONTOS
+
+
+TABELA_VIARIA_REVALIDAR_S = 60
+_TABELA_VIARIA: dict = {}  # (origem_tipo, origem_id) -> {ponto_apoio_id (str): km}
+_ASSINATURA_TABELA_VIARIA = None
+_TABELA_VIARIA_CONFERIDA_EM = None
+
+_SQL_ASSINATURA_VIARIA = text("SELECT COUNT(*), MAX(calculado_em) FROM distancia_viaria_ponto_apoio")
+_SQL_TABELA_VIARIA = text(
+    "SELECT origem_tipo, origem_id, ponto_apoio_id, distancia_km FROM distancia_viaria_ponto_apoio"
+)
+
+
+def _obter_tabela_viaria(db: Session) -> dict:
+    """Tabela de distâncias pela malha viária (ver distancias_viarias),
+    inteira em memória para consultas O(1). Só é regravada pelo job de
+    pré-cálculo, então a assinatura (quantidade, último calculado_em) é
+    conferida no máximo a cada TABELA_VIARIA_REVALIDAR_S."""
+    global _TABELA_VIARIA, _ASSINATURA_TABELA_VIARIA, _TABELA_VIARIA_CONFERIDA_EM
+    agora = time.monotonic()
+    if _TABELA_VIARIA_CONFERIDA_EM is not None and agora - _TABELA_VIARIA_CONFERIDA_EM <= TABELA_VIARIA_REVALIDAR_S:
+        return _TABELA_VIARIA
+
+    assinatura = tuple(db.execute(_SQL_ASSINATURA_VIARIA).one())
+    if assinatura != _ASSINATURA_TABELA_VIARIA:
+        tabela = {}
+        for origem_tipo, origem_id, ponto_apoio_id, km in db.execute(_SQL_TABELA_VIARIA):
+            tabela.setdefault((origem_tipo, origem_id), {})[str(ponto_apoio_id)] = float(km)
+        _TABELA_VIARIA, _ASSINATURA_TABELA_VIARIA = tabela, assinatura
+    _TABELA_VIARIA_CONFERIDA_EM = agora
+    return _TABELA_VIARIA
+
+
+def _distancias_viarias(db: Session, abrigo_id: UUID, lat_ref, lon_ref, origem: str) -> dict:
+    """{ponto_apoio_id (str): km pela estrada} a partir da referência de
+    localização; vazio quando a origem não está na tabela."""
+    chave = chave_origem(origem, abrigo_id, lat_ref, lon_ref)
+    return _obter_tabela_viaria(db).get(chave, {}) if chave is not None else {}
+
+
+def _folga_origem_viaria(abrigo_id: UUID, lat_ref: float, lon_ref: float, origem: str) -> float:
+    """Distância entre a referência e o ponto de onde a tabela viária mediu
+    a origem: zero para 'abrigo' (mesma coordenada), a distância até o
+    centroide do bairro para 'endereco_tutor'."""
+    coords = coordenadas_da_origem(chave_origem(origem, abrigo_id, lat_ref, lon_ref))
+    return _haversine_km(lat_ref, lon_ref, *coords) if coords else 0.0
+
+
+def _pontos_mais_proximos(
+    db: Session, lat_ref: float, lon_ref: float, limite: int, apenas_com_vaga: bool,
+    viarias: Optional[dict] = None, folga_km: float = 0.0,
+) -> List[dict]:
+    """k pontos mais próximos (com vaga, se pedido). Os candidatos saem do
+    índice em ordem de distância e são carregados do banco em lotes —
+    ocupação/vaga é sempre lida na hora, só as coordenadas ficam no índice.
+
+    Com distâncias viárias (`viarias`), a ordem final é pela estrada. A
+    estrada não é mais curta que a linha reta a partir da origem da tabela,
+    que fica a `folga_km` da referência (centroide do bairro do tutor);
+    pela desigualdade triangular, linha reta do próximo candidato menos a
+    folga é um limite inferior, e a busca para quando ele já alcança a
+    k-ésima melhor distância encontrada."""
+    viarias = viarias or {}
+    candidatos = _obter_indice_pontos(db).vizinhos(lat_ref, lon_ref)
+    aceitos = []  # (distância final, item), em ordem crescente
+    encerrado = False
+    while not encerrado:
+        lote = list(islice(candidatos, max(_LOTE_CANDIDATOS, 4 * limite)))
+        if not lote:
+            break
+        pontos = {
+            p.id: p for p in db.query(PontoApoioAnimal)
+            .filter(PontoApoioAnimal.id.in_([pid for pid, _ in lote]), PontoApoioAnimal.ativo.is_(True))
+        }
+        for ponto_id, linha_reta in lote:
+            if len(aceitos) >= limite and linha_reta - folga_km >= aceitos[limite - 1][0]:
+                encerrado = True
+                break
+            p = pontos.get(ponto_id)
+            if p is None:
+                continue
+            vagas = p.capacidade_maxima - p.ocupacao_atual
+            if apenas_com_vaga and vagas <= 0:
+                continue
+            viaria = viarias.get(str(ponto_id))
+            distancia = viaria if viaria is not None else linha_reta
+            aceitos.append((distancia, {
+                "ponto": p,
+                "ocupacao_atual": p.ocupacao_atual,
+                "vagas_disponiveis": vagas,
+                "distancia_km": round(distancia, 2),
+                "distancia_tipo": "viaria" if viaria is not None else "linha_reta",
+            }))
+            aceitos.sort(key=lambda a: a[0])
+    return [item for _, item in aceitos[:limite]]
+
+
 def sugerir_pontos_por_proximidade(
-    db: Session, animal_id: UUID, apenas_com_vaga: bool = True, ignorar_proximidade: bool = False
+    db: Session, animal_id: UUID, apenas_com_vaga: bool = True, ignorar_proximidade: bool = False,
+    limite: Optional[int] = None,
 ) -> dict:
-    """Retorna os pontos de apoio ativos, com a ocupação/vaga calculada
-    em tempo real.
+    """Retorna os pontos de apoio ativos, com a ocupação/vaga lida do
+    contador mantido em cada ponto.
 
     Comportamento:
     - ignorar_proximidade=False (padrão): tenta ordenar do mais próximo
@@ -129,6 +565,14 @@ def sugerir_pontos_por_proximidade(
     - ignorar_proximidade=True: pulo deliberado do cálculo de distância,
       a pedido do operador (ex.: quer ver todos os pontos disponíveis
       independentemente de onde o tutor mora). Lista ordenada por nome.
+    - limite=k (com proximidade): devolve só os k pontos mais próximos
+      (com vaga, se apenas_com_vaga), percorrendo o índice espacial do
+      mais próximo em diante e parando assim que os k forem encontrados.
+
+    Distâncias: pela malha viária quando o par (origem da referência,
+    ponto) está na tabela pré-calculada, senão em linha reta (Haversine);
+    `distancia_tipo` em cada item diz qual foi usada. Pontos sem
+    coordenadas vêm no fim, por nome, sem distância.
 
     O retorno inclui `referencia_origem` ('endereco_tutor' | 'abrigo' |
     'indisponivel' | 'ignorado_pelo_operador') para a UI explicar ao
@@ -138,12 +582,14 @@ def sugerir_pontos_por_proximidade(
     if animal is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Animal não encontrado.")
 
-    pontos = db.query(PontoApoioAnimal).filter(PontoApoioAnimal.ativo.is_(True)).all()
+    def _pontos_ativos():
+        # A ocupação vem do contador já carregado com cada ponto
+        return db.query(PontoApoioAnimal).filter(PontoApoioAnimal.ativo.is_(True)).all()
 
     def _montar_lista_sem_distancia():
         itens = []
-        for p in pontos:
-            ocupacao = _ocupacao_atual(db, p.id)
+        for p in _pontos_ativos():
+            ocupacao = p.ocupacao_atual
             vagas = p.capacidade_maxima - ocupacao
             if apenas_com_vaga and vagas <= 0:
                 continue
@@ -164,21 +610,50 @@ def sugerir_pontos_por_proximidade(
         # não é possível ordenar por distância.
         return {"itens": _montar_lista_sem_distancia(), "referencia_origem": "indisponivel"}
 
+    viarias = _distancias_viarias(db, animal.abrigo_humano_id, lat_ref, lon_ref, origem)
+
+    if limite is not None:
+        folga = _folga_origem_viaria(animal.abrigo_humano_id, lat_ref, lon_ref, origem) if viarias else 0.0
+        itens = _pontos_mais_proximos(db, lat_ref, lon_ref, limite, apenas_com_vaga, viarias, folga)
+        return {"itens": itens, "referencia_origem": origem}
+
+    pontos = [
+        p for p in _pontos_ativos()
+        if not (apenas_com_vaga and p.capacidade_maxima - p.ocupacao_atual <= 0)
+    ]
+    # Pontos sem coordenadas não entram na matriz: vão para o fim da
+    # lista, por nome, sem distância
+    pontos_geo = [p for p in pontos if p.latitude is not None and p.longitude is not None]
+    sem_coordenadas = sorted(
+        (p for p in pontos if p.latitude is None or p.longitude is None), key=lambda p: p.nome
+    )
+    # Distância a todos os pontos numa só chamada do motor vetorizado
+    distancias = matriz_distancias_km(
+        [(lat_ref, lon_ref)], [(float(p.latitude), float(p.longitude)) for p in pontos_geo]
+    )[0] if pontos_geo else []
+
     resultado = []
-    for p in pontos:
-        ocupacao = _ocupacao_atual(db, p.id)
-        vagas = p.capacidade_maxima - ocupacao
-        if apenas_com_vaga and vagas <= 0:
-            continue
-        distancia = _haversine_km(lat_ref, lon_ref, float(p.latitude), float(p.longitude))
+    for p, distancia in zip(pontos_geo, distancias):
+        viaria = viarias.get(str(p.id))
         resultado.append({
             "ponto": p,
-            "ocupacao_atual": ocupacao,
-            "vagas_disponiveis": vagas,
-            "distancia_km": round(distancia, 2),
+            "ocupacao_atual": p.ocupacao_atual,
+            "vagas_disponiveis": p.capacidade_maxima - p.ocupacao_atual,
+            "distancia_km": round(viaria if viaria is not None else float(distancia), 2),
+            "distancia_tipo": "viaria" if viaria is not None else "linha_reta",
         })
 
     resultado.sort(key=lambda r: r["distancia_km"])
+    resultado += [
+        {
+            "ponto": p,
+            "ocupacao_atual": p.ocupacao_atual,
+            "vagas_disponiveis": p.capacidade_maxima - p.ocupacao_atual,
+            "distancia_km": None,
+            "distancia_tipo": None,
+        }
+        for p in sem_coordenadas
+    ]
     return {"itens": resultado, "referencia_origem": origem}
 
 
@@ -189,26 +664,62 @@ def encaminhar_animal(
     db: Session, animal_id: UUID, ponto_apoio_id: UUID, usuario_id: UUID,
     observacao: Optional[str] = None, ignorar_proximidade: bool = False,
 ) -> AnimalEncaminhamento:
-    animal = db.query(AnimalEstimacao).get(animal_id)
+    """Encaminha (ou transfere) o animal numa única transação protegida:
+
+    1. o animal é travado (FOR NO KEY UPDATE) — dois operadores movendo o
+       mesmo animal ao mesmo tempo entram em fila;
+    2. o ponto de destino e, numa transferência, o de origem são travados
+       (FOR UPDATE, em ordem de id, a mesma do encaminhamento em lote),
+       então a vaga conferida não pode ser tomada por outro encaminhamento
+       antes do commit;
+    3. o encaminhamento anterior é encerrado e o novo aberto, e o trigger
+       atualiza o contador dos dois pontos — tudo no mesmo commit.
+
+    No banco, o trigger só incrementa ocupacao_atual se ainda houver vaga
+    e o índice único garante um só encaminhamento ativo por animal; se
+    qualquer um dos dois recusar (escrita concorrente por outro caminho),
+    a transação é desfeita e a resposta é 409."""
+    animal = (
+        db.query(AnimalEstimacao)
+        .filter(AnimalEstimacao.id == animal_id)
+        .with_for_update(key_share=True)
+        .one_or_none()
+    )
     if animal is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Animal não encontrado.")
 
-    ponto = db.query(PontoApoioAnimal).get(ponto_apoio_id)
-    if ponto is None or not ponto.ativo:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Ponto de apoio não encontrado ou inativo.")
-
-    ocupacao = _ocupacao_atual(db, ponto_apoio_id)
-    if ocupacao >= ponto.capacidade_maxima:
-        raise HTTPException(status.HTTP_409_CONFLICT, f"O ponto de apoio '{ponto.nome}' está sem vagas.")
-
     # Encerra encaminhamento ativo anterior, se houver (transferência)
     anterior = (
         db.query(AnimalEncaminhamento)
         .filter(AnimalEncaminhamento.animal_id == animal_id, AnimalEncaminhamento.ativo.is_(True))
         .first()
     )
+
+    ids_pontos = {ponto_apoio_id} | ({anterior.ponto_apoio_id} if anterior else set())
+    travados = {
+        p.id: p for p in db.query(PontoApoioAnimal)
+        .filter(PontoApoioAnimal.id.in_(ids_pontos))
+        .order_by(PontoApoioAnimal.id)
+        .with_for_update()
+        .populate_existing()
+    }
+    ponto = travados.get(ponto_apoio_id)
+    if ponto is None or not ponto.ativo:
+        db.rollback()
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Ponto de apoio não encontrado ou inativo.")
+
+    # Reencaminhar para o mesmo ponto em que o animal já ocupa vaga não consome outra
+    ja_ocupa = (
+        anterior is not None and anterior.ponto_apoio_id == ponto_apoio_id
+        and anterior.status in _STATUS_OCUPANDO_VAGA
+    )
+    if not ja_ocupa and ponto.ocupacao_atual >= ponto.capacidade_maxima:
+        db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, f"O ponto de apoio '{ponto.nome}' está sem vagas.")
+
     if anterior:
         anterior.ativo = False
+        db.flush()  # encerra antes de abrir o novo: índice único de um ativo por animal
 
     # A distância só é calculada quando o operador não pediu para
     # ignorá-la E existe alguma referência de localização disponível.
@@ -219,7 +730,10 @@ def encaminhar_animal(
     if not ignorar_proximidade:
         lat_ref, lon_ref, origem = _referencia_localizacao_tutor(db, animal)
         if origem != "indisponivel":
-            distancia = round(_haversine_km(lat_ref, lon_ref, float(ponto.latitude), float(ponto.longitude)), 2)
+            distancia = _distancias_viarias(db, animal.abrigo_humano_id, lat_ref, lon_ref, origem).get(str(ponto.id))
+            if distancia is None:
+                distancia = _haversine_km(lat_ref, lon_ref, float(ponto.latitude), float(ponto.longitude))
+            distancia = round(distancia, 2)
 
     novo = AnimalEncaminhamento(
         animal_id=animal_id,
@@ -230,8 +744,16 @@ def encaminhar_animal(
         observacao=observacao,
     )
     db.add(novo)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            f"Encaminhamento recusado: sem vaga em '{ponto.nome}' ou o animal já foi encaminhado por outra operação.",
+        )
     db.refresh(novo)
+    _publicar_ocupacao(db, ids_pontos)
     return novo
 
 
@@ -258,4 +780,207 @@ def atualizar_status_encaminhamento(
 
     db.commit()
     db.refresh(encaminhamento)
+    _publicar_ocupacao(db, [encaminhamento.ponto_apoio_id])
     return encaminhamento
+
+
+# ---------------------------------------------------------------------
+# Encaminhamento em lote (evacuação em massa)
+# ---------------------------------------------------------------------
+def _valor(campo) -> Optional[str]:
+    valor = getattr(campo, "value", campo)
+    return str(valor).lower() if valor is not None else None
+
+
+def _ponto_aceita(ponto: PontoApoioAnimal, animal: AnimalEstimacao) -> bool:
+    """Restrições do ponto (NULL/vazio = aceita qualquer um). Animal sem
+    porte informado não vai para ponto que restringe porte."""
+    especies = ponto.especies_aceitas
+    if especies and _valor(animal.especie) not in {e.lower() for e in especies}:
+        return False
+    portes = ponto.portes_aceitos
+    if portes and _valor(animal.porte) not in {p.lower() for p in portes}:
+        return False
+    return True
+
+
+LOTE_TENTATIVAS = 3
+
+
+def _propor_lote(
+    db: Session, abrigo_humano_id: Optional[UUID], municipio_id: Optional[UUID],
+) -> tuple:
+    """Proposta de distribuição (atribuidos, nao_atribuidos) com os animais
+    sem encaminhamento ativo e as vagas lidas agora, sem travas — a
+    otimização pode levar segundos e não deve bloquear os encaminhamentos
+    avulsos. Ver encaminhar_em_lote."""
+    pontos = [
+        p for p in db.query(PontoApoioAnimal)
+        .filter(PontoApoioAnimal.ativo.is_(True))
+        .order_by(PontoApoioAnimal.id)
+        .populate_existing()
+        .all()
+        if p.capacidade_maxima - p.ocupacao_atual > 0
+    ]
+
+    com_encaminhamento_ativo = db.query(AnimalEncaminhamento.animal_id).filter(
+        AnimalEncaminhamento.ativo.is_(True)
+    )
+    consulta = db.query(AnimalEstimacao).filter(
+        AnimalEstimacao.ativo.is_(True), ~AnimalEstimacao.id.in_(com_encaminhamento_ativo)
+    )
+    if abrigo_humano_id is not None:
+        consulta = consulta.filter(AnimalEstimacao.abrigo_humano_id == abrigo_humano_id)
+    else:
+        consulta = consulta.join(Abrigo, Abrigo.id == AnimalEstimacao.abrigo_humano_id).filter(
+            Abrigo.municipio_id == municipio_id
+        )
+    animais = consulta.order_by(AnimalEstimacao.created_at).all()
+
+    vagas = {p.id: p.capacidade_maxima - p.ocupacao_atual for p in pontos}
+    referencias_origem = _referencias_localizacao(db, animais)
+    referencias = {
+        animal_id: (lat, lon) if origem != "indisponivel" else None
+        for animal_id, (lat, lon, origem) in referencias_origem.items()
+    }
+    localizados = [a for a in animais if referencias[a.id] is not None]
+    pontos_geo = [p for p in pontos if p.latitude is not None and p.longitude is not None]
+
+    destino = {}  # animal_id -> (ponto, distancia_km ou None)
+    if localizados and pontos_geo:
+        # Tutores do mesmo endereço compartilham a linha da matriz
+        linhas = {}
+        for a in localizados:
+            linhas.setdefault(referencias[a.id], len(linhas))
+        distancias = matriz_distancias_km(
+            list(linhas), [(float(p.latitude), float(p.longitude)) for p in pontos_geo]
+        )
+        candidatos = []
+        for a in localizados:
+            linha = distancias[linhas[referencias[a.id]]]
+            # Estrada quando o par está na tabela viária, senão linha reta
+            viarias = _distancias_viarias(db, a.abrigo_humano_id, *referencias_origem[a.id])
+            candidatos.append([
+                (k, viarias.get(str(p.id), float(linha[k])))
+                for k, p in enumerate(pontos_geo) if _ponto_aceita(p, a)
+            ])
+        atribuicao = atribuir_min_distancia(candidatos, [vagas[p.id] for p in pontos_geo])
+        for a, cand, k in zip(localizados, candidatos, atribuicao):
+            if k is not None:
+                destino[a.id] = (pontos_geo[k], dict(cand)[k])
+                vagas[pontos_geo[k].id] -= 1
+
+    # Sem referência (ou sem vaga entre os pontos com coordenadas): ponto
+    # compatível do próprio abrigo, senão o de mais vagas restantes
+    nao_atribuidos = []
+    for a in animais:
+        if a.id in destino:
+            continue
+        compativeis = [p for p in pontos if vagas[p.id] > 0 and _ponto_aceita(p, a)]
+        if referencias[a.id] is not None:
+            # só sobram pontos sem coordenadas: a distância não é conhecida
+            compativeis = [p for p in compativeis if p.latitude is None or p.longitude is None]
+        if not compativeis:
+            nao_atribuidos.append({"animal": a, "motivo": "sem ponto de apoio compatível com vaga"})
+            continue
+        ponto = max(
+            compativeis,
+            key=lambda p: (p.abrigo_humano_vinculado_id == a.abrigo_humano_id, vagas[p.id]),
+        )
+        destino[a.id] = (ponto, None)
+        vagas[ponto.id] -= 1
+
+    atribuidos = [
+        {"animal": a, "ponto": destino[a.id][0],
+         "distancia_km": round(destino[a.id][1], 2) if destino[a.id][1] is not None else None}
+        for a in animais if a.id in destino
+    ]
+    return atribuidos, nao_atribuidos
+
+
+def encaminhar_em_lote(
+    db: Session, usuario_id: UUID, abrigo_humano_id: Optional[UUID] = None,
+    municipio_id: Optional[UUID] = None, observacao: Optional[str] = None, simular: bool = False,
+) -> dict:
+    """Encaminha de uma vez todos os animais ativos sem encaminhamento
+    ativo de um abrigo (abrigo_humano_id) ou de todos os abrigos de um
+    município (municipio_id).
+
+    Em vez de "cada um no mais próximo com vaga", na ordem em que o
+    operador clica, resolve a atribuição com capacidade de menor
+    distância total (ver alocacao_pontos_apoio): o maior número possível
+    de animais recebe ponto, respeitando vagas e as restrições de espécie
+    e porte de cada ponto, e ninguém fica longe do tutor só porque outro
+    animal chegou antes ao ponto mais próximo.
+
+    Animais sem nenhuma coordenada de referência (nem tutor, nem abrigo)
+    e pontos sem coordenadas ficam fora da otimização; esses animais vão,
+    em seguida, para o ponto compatível vinculado ao próprio abrigo ou,
+    na falta dele, para o de mais vagas restantes, com distância NULL.
+
+    A proposta é calculada sem travas (leitura das vagas + otimização,
+    que leva segundos em lotes grandes). Só então os pontos usados são
+    travados (SELECT ... FOR UPDATE, em ordem de id) e as vagas
+    conferidas: se ainda comportam a proposta, todos os encaminhamentos
+    são gravados num único commit — ou nenhum; se algum ponto perdeu
+    vagas ou foi desativado no meio, as travas são liberadas e a proposta
+    é refeita com os dados atuais (até LOTE_TENTATIVAS vezes, depois 409).
+    simular=True devolve a proposta sem travar nem gravar nada."""
+    if (abrigo_humano_id is None) == (municipio_id is None):
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, "Informe abrigo_humano_id ou municipio_id (apenas um)."
+        )
+
+    for _ in range(LOTE_TENTATIVAS):
+        atribuidos, nao_atribuidos = _propor_lote(db, abrigo_humano_id, municipio_id)
+        if simular or not atribuidos:
+            break
+        por_ponto = Counter(item["ponto"].id for item in atribuidos)
+        travados = (
+            db.query(PontoApoioAnimal)
+            .filter(PontoApoioAnimal.id.in_(list(por_ponto)))
+            .order_by(PontoApoioAnimal.id)
+            .with_for_update()
+            .populate_existing()
+            .all()
+        )
+        if len(travados) == len(por_ponto) and all(
+            p.ativo and p.capacidade_maxima - p.ocupacao_atual >= por_ponto[p.id] for p in travados
+        ):
+            break
+        db.rollback()  # vagas mudaram desde a leitura: solta as travas e refaz
+    else:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            "Lote recusado: as vagas dos pontos mudaram durante a distribuição. Tente novamente.",
+        )
+
+    if not simular and atribuidos:
+        db.add_all([
+            AnimalEncaminhamento(
+                animal_id=item["animal"].id,
+                ponto_apoio_id=item["ponto"].id,
+                distancia_km_no_momento=item["distancia_km"],
+                status=StatusEncaminhamentoAnimal.ENCAMINHADO,
+                usuario_responsavel_id=usuario_id,
+                observacao=observacao,
+            )
+            for item in atribuidos
+        ])
+        try:
+            db.commit()
+        except IntegrityError:
+            # algum animal do lote foi encaminhado por outra operação no meio
+            db.rollback()
+            raise HTTPException(
+                status.HTTP_409_CONFLICT,
+                "Lote recusado: houve encaminhamento concorrente de algum animal. Refaça a distribuição.",
+            )
+        _publicar_ocupacao(db, {item["ponto"].id for item in atribuidos})
+
+    return {
+        "atribuidos": atribuidos,
+        "nao_atribuidos": nao_atribuidos,
+        "distancia_total_km": round(sum(i["distancia_km"] or 0 for i in atribuidos), 2),
+        "simulacao": simular,
+    }
@@ -0,0 +1,51 @@
+"""
+Motor de distâncias (Haversine) para o roteamento de animais.
+
+`matriz_distancias_km` calcula de uma vez a matriz M×N entre as
+referências de localização (tutores/abrigos) e os pontos de apoio. Com
+NumPy disponível o cálculo é vetorizado; sem ele, cai para o laço
+escalar com `math`, com o mesmo resultado — NumPy é dependência
+opcional, não obrigatória para o módulo funcionar.
+
+Usado pela sugestão de pontos (1×N) e pelo encaminhamento em massa (M×N).
+"""
+from __future__ import annotations
+
+import math
+from typing import Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - ambiente sem NumPy
+    np = None
+
+RAIO_TERRA_KM = 6371.0
+
+Coordenada = Tuple[float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return RAIO_TERRA_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def matriz_distancias_km(origens: Sequence[Coordenada], destinos: Sequence[Coordenada]):
+    """Distância (km) de cada origem (linha) a cada destino (coluna).
+
+    Retorna um ndarray M×N quando NumPy está disponível, ou uma lista de
+    listas equivalente caso contrário — nos dois casos indexável como
+    matriz[i][j]."""
+    if np is None:
+        return [[haversine_km(la, lo, lb, lob) for lb, lob in destinos] for la, lo in origens]
+
+    orig = np.radians(np.asarray(origens, dtype=float).reshape(-1, 2))
+    dest = np.radians(np.asarray(destinos, dtype=float).reshape(-1, 2))
+    phi1 = orig[:, 0][:, None]
+    phi2 = dest[:, 0][None, :]
+    d_phi = phi2 - phi1
+    d_lambda = dest[:, 1][None, :] - orig[:, 1][:, None]
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return RAIO_TERRA_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
@@ -0,0 +1,153 @@
+"""
+Distâncias pela malha viária entre origens (abrigos e bairros) e pontos
+de apoio animal.
+
+Em Santa Maria de Jetibá, relevo acidentado e estradas rurais sinuosas,
+a distância em linha reta (Haversine) engana: dois pontos a 3 km podem
+estar a 15 km de estrada. Calcular rotas a cada request seria lento
+demais, então a tabela origem × ponto de apoio é pré-calculada fora do
+horário de pico por scripts/precalcular_distancias_viarias.py e gravada
+em `distancia_viaria_ponto_apoio`; o serviço a mantém em memória e faz
+consultas O(1), caindo para o Haversine quando o par não está na tabela.
+
+Origens da tabela:
+- ('abrigo', <id do abrigo>)  — referência 'abrigo' na sugestão;
+- ('bairro', <fid do bairro>) — referência 'endereco_tutor': o endereço
+  do tutor é aproximado pelo centroide do bairro em que está
+  (public/Bairros.geojson).
+
+Sem dependências do app, para ser usado também pelo script de pré-cálculo.
+"""
+from __future__ import annotations
+
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+BAIRROS_GEOJSON = os.environ.get("BAIRROS_GEOJSON", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "public", "Bairros.geojson"))
+
+ORIGEM_ABRIGO = "abrigo"
+ORIGEM_BAIRRO = "bairro"
+
+Anel = List[Tuple[float, float]]  # [(lon, lat), ...]
+
+
+def _anel_contem(anel: Anel, lon: float, lat: float) -> bool:
+    dentro = False
+    j = len(anel) - 1
+    for i in range(len(anel)):
+        xi, yi = anel[i]
+        xj, yj = anel[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            dentro = not dentro
+        j = i
+    return dentro
+
+
+def _centroide_anel(anel: Anel) -> Tuple[float, float, float]:
+    """(lat, lon, área) do centroide de um anel (fórmula do polígono)."""
+    a = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(anel, anel[1:] + anel[:1]):
+        f = x0 * y1 - x1 * y0
+        a += f
+        cx += (x0 + x1) * f
+        cy += (y0 + y1) * f
+    if a == 0:
+        xs, ys = zip(*anel)
+        return sum(ys) / len(ys), sum(xs) / len(xs), 0.0
+    return cy / (3 * a), cx / (3 * a), abs(a) / 2
+
+
+class Bairros:
+    """Polígonos dos bairros com caixa delimitadora para descartar rápido."""
+
+    def __init__(self, features):
+        self._bairros = []
+        for f in features:
+            geom = f.get("geometry") or {}
+            if geom.get("type") == "Polygon":
+                poligonos = [geom["coordinates"]]
+            elif geom.get("type") == "MultiPolygon":
+                poligonos = geom["coordinates"]
+            else:
+                continue
+            poligonos = [[[tuple(pt[:2]) for pt in anel] for anel in pol] for pol in poligonos]
+            xs = [x for pol in poligonos for x, _ in pol[0]]
+            ys = [y for pol in poligonos for _, y in pol[0]]
+            props = f.get("properties") or {}
+            self._bairros.append((props.get("fid"), props.get("nome"), (min(xs), min(ys), max(xs), max(ys)), poligonos))
+
+    def __len__(self):
+        return len(self._bairros)
+
+    def localizar(self, lat: float, lon: float) -> Optional[int]:
+        """fid do bairro que contém o ponto, ou None."""
+        for fid, _, (x0, y0, x1, y1), poligonos in self._bairros:
+            if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+                continue
+            for exterior, *buracos in poligonos:
+                if _anel_contem(exterior, lon, lat) and not any(_anel_contem(b, lon, lat) for b in buracos):
+                    return fid
+        return None
+
+    def centroides(self) -> Dict[int, Tuple[float, float]]:
+        """{fid: (lat, lon)} — centroide do maior polígono de cada bairro."""
+        resultado = {}
+        for fid, _, _, poligonos in self._bairros:
+            lat, lon, _ = max((_centroide_anel(pol[0]) for pol in poligonos), key=lambda c: c[2])
+            resultado[fid] = (lat, lon)
+        return resultado
+
+
+_BAIRROS = None
+
+
+def get_bairros() -> Bairros:
+    """Carrega os bairros na primeira chamada e os reutiliza (uma vez por processo)."""
+    global _BAIRROS
+    if _BAIRROS is None:
+        # Sem bairros, toda origem 'endereço do tutor' perderia a distância
+        # viária sem aviso: falha alto em vez de seguir com o conjunto vazio
+        try:
+            with open(BAIRROS_GEOJSON, "r", encoding="utf-8") as f:
+                features = json.load(f).get("features", [])
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Bairros indisponíveis ({BAIRROS_GEOJSON}): {e}") from e
+        if not features:
+            raise RuntimeError(f"Bairros vazios: {BAIRROS_GEOJSON}")
+        _BAIRROS = Bairros(features)
+    return _BAIRROS
+
+
+@lru_cache(maxsize=4096)
+def bairro_do_ponto(lat: float, lon: float) -> Optional[int]:
+    return get_bairros().localizar(lat, lon)
+
+
+@lru_cache(maxsize=1)
+def _centroides_bairros() -> Dict[int, Tuple[float, float]]:
+    return get_bairros().centroides()
+
+
+def coordenadas_da_origem(chave: Optional[Tuple[str, str]]) -> Optional[Tuple[float, float]]:
+    """(lat, lon) de onde a tabela mediu as distâncias de uma origem
+    'bairro' (o centroide), ou None para as demais chaves."""
+    if chave is None or chave[0] != ORIGEM_BAIRRO:
+        return None
+    for fid, coords in _centroides_bairros().items():
+        if str(fid) == chave[1]:
+            return coords
+    return None
+
+
+def chave_origem(origem: str, abrigo_id, lat: Optional[float], lon: Optional[float]) -> Optional[Tuple[str, str]]:
+    """Chave da tabela viária para a referência de localização de um
+    animal (ver _referencia_localizacao_tutor), ou None se não houver."""
+    if origem == "abrigo":
+        return ORIGEM_ABRIGO, str(abrigo_id)
+    if origem == "endereco_tutor":
+        fid = bairro_do_ponto(round(lat, 5), round(lon, 5))
+        return (ORIGEM_BAIRRO, str(fid)) if fid is not None else None
+    return None
@@ -0,0 +1,31 @@
+"""
+Barramento de eventos de ocupação dos pontos de apoio animal, para o
+painel do abrigo em tempo real (SSE em GET /api/pontos-apoio-animal/stream).
+
+Cada mudança de ocupação/vaga de um ponto vira um evento pequeno
+({"ponto_apoio_id", "ocupacao_atual", "capacidade_maxima", "ativo"})
+entregue a todas as conexões abertas.
+
+Fontes dos eventos:
+- Postgres LISTEN/NOTIFY no canal 'ponto_apoio_ocupacao' (trigger da
+  migração 20261019_ponto_apoio_animal_notify.sql), quando DATABASE_URL e
+  psycopg2 estiverem disponíveis — pega alterações feitas por qualquer
+  processo, inclusive encaminhamentos gravados direto pelo app;
+- publicação local pelo serviço após o commit (encaminhar_animal,
+  atualizar_status_encaminhamento, lote, reconciliação), como substituto
+  quando não há LISTEN.
+As duas fontes podem coexistir: cada conexão só repassa valores que
+mudaram, então um evento duplicado não chega ao cliente.
+
+A entrega, o LISTEN com reconexão e o RESSINCRONIZAR (fila cheia ou
+LISTEN reconectado: o stream termina e o EventSource reabre com snapshot
+novo) são os do barramento genérico api/utils/barramento_eventos.py,
+compartilhado com o PLACON.
+"""
+from __future__ import annotations
+
+from api.utils.barramento_eventos import RESSINCRONIZAR, BarramentoNotify  # noqa: F401
+
+CANAL_NOTIFY = "ponto_apoio_ocupacao"
+
+barramento_pontos_apoio = BarramentoNotify(CANAL_NOTIFY, "dos pontos de apoio", "pontos-apoio-listen")
@@ -0,0 +1,116 @@
+"""
+Índice em memória dos animais ativos de todos os abrigos, para o
+reencontro com o tutor (pessoa procurando o animal em outro abrigo).
+
+- Microchip: hash exato pelo número normalizado (só letras e dígitos).
+- Descrição: os animais são agrupados em blocos (espécie, porte, sexo) e
+  o texto livre (nome, raça, temperamento, saúde) é indexado por
+  trigramas, no mesmo esquema do índice de logradouros. A busca só
+  pontua os animais dos blocos compatíveis que compartilham algum
+  trigrama com o texto pedido; o score é a fração dos trigramas da
+  consulta presentes na descrição do animal (uma descrição longa não é
+  penalizada por ter mais informação que a consulta).
+
+Sem dependências do app — só tuplas —, para poder ser reconstruído e
+testado isoladamente.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+SCORE_MINIMO = 0.5
+
+
+def _normalizar(texto) -> str:
+    if not texto:
+        return ""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).upper()
+    return " ".join(re.sub(r"[^A-Z0-9]+", " ", texto).split())
+
+
+def normalizar_microchip(numero) -> str:
+    return re.sub(r"[^A-Z0-9]", "", str(numero or "").upper())
+
+
+def _trigramas(texto: str) -> set:
+    grams = set()
+    for palavra in texto.split():
+        padded = f"  {palavra} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _chave_bloco(valor) -> str:
+    return _normalizar(getattr(valor, "value", valor))
+
+
+class IndiceAnimais:
+    """Registros: (animal_id, abrigo_id, municipio_id, microchip, especie,
+    porte, sexo, nome, raca, temperamento, saude). Imutável: quando os
+    animais mudam, constrói-se outro índice."""
+
+    def __init__(self, registros: Iterable[Tuple]):
+        self._local = {}                   # animal_id -> (abrigo_id, municipio_id)
+        self._por_microchip = defaultdict(list)
+        self._blocos = defaultdict(set)    # (especie, porte, sexo) -> {animal_id}
+        self._postings = defaultdict(list)
+
+        for (animal_id, abrigo_id, municipio_id, microchip, especie, porte, sexo,
+             nome, raca, temperamento, saude) in registros:
+            self._local[animal_id] = (abrigo_id, municipio_id)
+            chip = normalizar_microchip(microchip)
+            if chip:
+                self._por_microchip[chip].append(animal_id)
+            self._blocos[(_chave_bloco(especie), _chave_bloco(porte), _chave_bloco(sexo))].add(animal_id)
+            descricao = _normalizar(" ".join(filter(None, (nome, raca, temperamento, saude))))
+            for g in _trigramas(descricao):
+                self._postings[g].append(animal_id)
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def _no_escopo(self, animal_id, abrigo_id, municipio_id) -> bool:
+        abrigo, municipio = self._local[animal_id]
+        return (abrigo_id is None or abrigo == abrigo_id) and (municipio_id is None or municipio == municipio_id)
+
+    def por_microchip(self, numero, abrigo_id=None, municipio_id=None) -> List:
+        return [
+            a for a in self._por_microchip.get(normalizar_microchip(numero), ())
+            if self._no_escopo(a, abrigo_id, municipio_id)
+        ]
+
+    def buscar(
+        self, texto: Optional[str] = None, especie=None, porte=None, sexo=None,
+        abrigo_id=None, municipio_id=None, limite: int = 20, score_minimo: float = SCORE_MINIMO,
+    ) -> List[Tuple[object, float]]:
+        """[(animal_id, score)] em ordem decrescente de score. especie/porte/
+        sexo None = qualquer um; animais com o campo não informado no
+        cadastro continuam candidatos (o bloco '' entra junto). Sem texto,
+        todos os animais dos blocos compatíveis voltam com score 1.0."""
+        filtros = [_chave_bloco(v) if v is not None else None for v in (especie, porte, sexo)]
+        candidatos = set()
+        for chave, ids in self._blocos.items():
+            if all(f is None or c in (f, "") for f, c in zip(filtros, chave)):
+                candidatos |= ids
+        candidatos = {a for a in candidatos if self._no_escopo(a, abrigo_id, municipio_id)}
+
+        grams = _trigramas(_normalizar(texto))
+        if not grams:
+            return [(a, 1.0) for a in list(candidatos)[:limite]]
+
+        comuns = defaultdict(int)
+        for g in grams:
+            for animal_id in self._postings.get(g, ()):
+                if animal_id in candidatos:
+                    comuns[animal_id] += 1
+
+        resultado = [
+            (animal_id, round(n / len(grams), 3)) for animal_id, n in comuns.items()
+            if n / len(grams) >= score_minimo
+        ]
+        resultado.sort(key=lambda r: -r[1])
+        return resultado[:limite]
@@ -0,0 +1,95 @@
+"""
+Índice espacial em memória dos pontos de apoio animal.
+
+Os pontos são convertidos para vetores unitários 3D (esfera) e guardados
+numa KD-tree com caixas delimitadoras por nó. A distância euclidiana
+(corda) entre vetores unitários cresce junto com a distância sobre a
+superfície, então a ordem dos vizinhos é exata, e a corda é convertida de
+volta para quilômetros no grande círculo — o mesmo valor do Haversine.
+
+A busca é incremental (best-first): `vizinhos()` devolve os pontos do
+mais próximo ao mais distante sob demanda, de forma que quem consome
+("k mais próximos com vaga") pode parar assim que tiver o suficiente,
+sem calcular nem ordenar a distância de todos os pontos.
+
+Sem dependências do app — só coordenadas e ids —, para poder ser
+reconstruído/testado isoladamente (ver scripts/benchmark_pontos_apoio.py).
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from itertools import count
+from typing import Iterable, Iterator, Tuple
+
+RAIO_TERRA_KM = 6371.0
+TAMANHO_FOLHA = 16
+
+
+def _vetor_unitario(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _corda_para_km(corda: float) -> float:
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, corda / 2))
+
+
+def _dist2_caixa(q, lo, hi) -> float:
+    d2 = 0.0
+    for d in range(3):
+        if q[d] < lo[d]:
+            d2 += (lo[d] - q[d]) ** 2
+        elif q[d] > hi[d]:
+            d2 += (q[d] - hi[d]) ** 2
+    return d2
+
+
+class IndicePontosApoio:
+    """KD-tree sobre (id, latitude, longitude). Imutável: quando os pontos
+    mudam, constrói-se outro índice."""
+
+    def __init__(self, pontos: Iterable[Tuple[object, float, float]]):
+        self._ids = []
+        self._xyz = []
+        for ponto_id, lat, lon in pontos:
+            self._ids.append(ponto_id)
+            self._xyz.append(_vetor_unitario(float(lat), float(lon)))
+        self._raiz = self._construir(list(range(len(self._ids)))) if self._ids else None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _construir(self, indices):
+        pts = [self._xyz[i] for i in indices]
+        lo = tuple(min(p[d] for p in pts) for d in range(3))
+        hi = tuple(max(p[d] for p in pts) for d in range(3))
+        if len(indices) <= TAMANHO_FOLHA:
+            return (lo, hi, None, None, indices)
+        eixo = max(range(3), key=lambda d: hi[d] - lo[d])
+        indices.sort(key=lambda i: self._xyz[i][eixo])
+        meio = len(indices) // 2
+        return (lo, hi, self._construir(indices[:meio]), self._construir(indices[meio:]), None)
+
+    def vizinhos(self, lat: float, lon: float) -> Iterator[Tuple[object, float]]:
+        """Gera (ponto_id, distancia_km) em ordem crescente de distância."""
+        if self._raiz is None:
+            return
+        q = _vetor_unitario(lat, lon)
+        desempate = count()
+        # Entradas: (distância² mínima, desempate, é_ponto, nó ou índice)
+        heap = [(_dist2_caixa(q, self._raiz[0], self._raiz[1]), next(desempate), False, self._raiz)]
+        while heap:
+            d2, _, eh_ponto, item = heapq.heappop(heap)
+            if eh_ponto:
+                yield self._ids[item], _corda_para_km(math.sqrt(d2))
+                continue
+            _, _, esquerda, direita, folha = item
+            if folha is not None:
+                for i in folha:
+                    p = self._xyz[i]
+                    dp = (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2
+                    heapq.heappush(heap, (dp, next(desempate), True, i))
+            else:
+                for filho in (esquerda, direita):
+                    heapq.heappush(heap, (_dist2_caixa(q, filho[0], filho[1]), next(desempate), False, filho))
@@ -4,34 +4,44 @@ Endpoints REST — Animais de Estimação dos Abrigados.
 Monte com: app.include_router(router, prefix="/api/abrigos")
 Monte também: app.include_router(pontos_router, prefix="/api/pontos-apoio-animal")
 """
-from typing import List
+import asyncio
+import json
+import os
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.security.auth import get_current_user, require_permission
 from app.models.animal_abrigo import PontoApoioAnimal, StatusEncaminhamentoAnimal
 from app.schemas.animal_abrigo import (
-    AnimalIn, AnimalOut, EncaminharAnimalIn, AtualizarStatusEncaminhamentoIn,
+    AnimalIn, AnimalOut, AnimalReencontroOut, EncaminharAnimalIn, AtualizarStatusEncaminhamentoIn,
     PontoApoioAnimalIn, PontoApoioAnimalOut, PontoApoioComDisponibilidadeOut,
     SugestaoPontosApoioOut, EncaminhamentoResumoOut,
+    EncaminharLoteIn, EncaminhamentoLoteOut, EncaminhamentoLoteItemOut, AnimalNaoAtribuidoOut,
 )
 from app.services import animal_abrigo_service as svc
+from app.services.eventos_pontos_apoio import RESSINCRONIZAR, barramento_pontos_apoio
 
 router = APIRouter(tags=["Abrigos - Animais de Estimação"])
 pontos_router = APIRouter(tags=["Pontos de Apoio Animal"])
 
+STREAM_KEEPALIVE_S = 15
 
-def _serializar_animal(animal) -> AnimalOut:
-    encaminhamento = animal.encaminhamento_ativo
+
+def _serializar_animal(animal, encaminhamento=None, ponto_apoio_nome: Optional[str] = None) -> AnimalOut:
+    """encaminhamento/ponto_apoio_nome vêm já carregados pela consulta da
+    listagem — nenhum relacionamento do animal é lido aqui."""
     encaminhamento_out = None
     if encaminhamento:
         encaminhamento_out = EncaminhamentoResumoOut(
             id=encaminhamento.id,
             ponto_apoio_id=encaminhamento.ponto_apoio_id,
-            ponto_apoio_nome=encaminhamento.ponto_apoio.nome,
+            ponto_apoio_nome=ponto_apoio_nome,
             status=encaminhamento.status.value,
             distancia_km_no_momento=float(encaminhamento.distancia_km_no_momento)
                 if encaminhamento.distancia_km_no_momento is not None else None,
@@ -49,9 +59,43 @@ def _serializar_animal(animal) -> AnimalOut:
 
 
 @router.get("/{abrigo_id}/animais", response_model=List[AnimalOut])
-def listar_animais(abrigo_id: UUID, db: Session = Depends(get_db), usuario=Depends(get_current_user)):
-    animais = svc.listar_animais_do_abrigo(db, abrigo_id)
-    return [_serializar_animal(a) for a in animais]
+def listar_animais(
+    abrigo_id: UUID, response: Response,
+    status_encaminhamento: Optional[str] = Query(
+        None, alias="status",
+        description="'encaminhado' | 'no_local' | 'sem_encaminhamento' (status do encaminhamento ativo)",
+    ),
+    apos: Optional[str] = Query(None, description="Cursor do header X-Proximo-Cursor da página anterior"),
+    limite: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db), usuario=Depends(get_current_user),
+):
+    """Animais do abrigo com o encaminhamento ativo, numa única consulta.
+    Quando há mais animais que `limite`, o header X-Proximo-Cursor traz o
+    valor de `apos` para a próxima página."""
+    pagina = svc.listar_animais_do_abrigo(db, abrigo_id, status_encaminhamento, apos, limite)
+    if pagina["proximo_cursor"]:
+        response.headers["X-Proximo-Cursor"] = pagina["proximo_cursor"]
+    return [_serializar_animal(a, enc, ponto_nome) for a, enc, ponto_nome in pagina["itens"]]
+
+
+@router.get("/animais/busca", response_model=List[AnimalReencontroOut])
+def buscar_animais(
+    microchip: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Nome, raça, cor, temperamento..."),
+    especie: Optional[str] = None, porte: Optional[str] = None, sexo: Optional[str] = None,
+    municipio_id: Optional[UUID] = None, abrigo_id: Optional[UUID] = None,
+    limite: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db), usuario=Depends(get_current_user),
+):
+    """Reencontro: procura o animal em todos os abrigos (ou nos do
+    município), pelo microchip exato ou pela descrição dada pelo tutor."""
+    encontrados = svc.buscar_animais_para_reencontro(
+        db, microchip, q, especie, porte, sexo, municipio_id, abrigo_id, limite
+    )
+    return [
+        AnimalReencontroOut(**_serializar_animal(a, enc, ponto_nome).dict(), score=score)
+        for a, enc, ponto_nome, score in encontrados
+    ]
 
 
 @router.post("/{abrigo_id}/animais", response_model=AnimalOut, status_code=status.HTTP_201_CREATED)
@@ -68,6 +112,7 @@ def cadastrar_animal(
 @router.get("/animais/{animal_id}/pontos-sugeridos", response_model=SugestaoPontosApoioOut)
 def sugerir_pontos(
     animal_id: UUID, apenas_com_vaga: bool = True, ignorar_proximidade: bool = False,
+    limite: Optional[int] = Query(None, ge=1, le=100),
     db: Session = Depends(get_db), usuario=Depends(get_current_user),
 ):
     """Lista os pontos de apoio animal ordenados do mais próximo ao mais
@@ -80,16 +125,26 @@ def sugerir_pontos(
     o tutor mora. O mesmo acontece automaticamente, mesmo sem o parâmetro,
     quando não há nenhuma coordenada disponível (nem do tutor, nem do
     abrigo) — o endpoint nunca falha por falta dessa informação.
+
+    `limite=k` devolve apenas os k pontos mais próximos (via índice
+    espacial, sem calcular a distância de todos os pontos).
+
+    A distância é pela estrada quando o par está na tabela viária
+    pré-calculada (scripts/precalcular_distancias_viarias.py), senão em
+    linha reta — ver `distancia_tipo` em cada item.
     """
-    sugestao = svc.sugerir_pontos_por_proximidade(db, animal_id, apenas_com_vaga, ignorar_proximidade)
+    sugestao = svc.sugerir_pontos_por_proximidade(
+        db, animal_id, apenas_com_vaga, ignorar_proximidade, limite
+    )
     itens = [
         PontoApoioComDisponibilidadeOut(
             id=s["ponto"].id, nome=s["ponto"].nome, tipo=s["ponto"].tipo,
             endereco=s["ponto"].endereco, latitude=float(s["ponto"].latitude),
             longitude=float(s["ponto"].longitude), capacidade_maxima=s["ponto"].capacidade_maxima,
             telefone_contato=s["ponto"].telefone_contato,
+            especies_aceitas=s["ponto"].especies_aceitas, portes_aceitos=s["ponto"].portes_aceitos,
             ocupacao_atual=s["ocupacao_atual"], vagas_disponiveis=s["vagas_disponiveis"],
-            distancia_km=s["distancia_km"],
+            distancia_km=s["distancia_km"], distancia_tipo=s.get("distancia_tipo"),
         )
         for s in sugestao["itens"]
     ]
@@ -114,6 +169,36 @@ def encaminhar_animal(
     )
 
 
+@router.post("/animais/encaminhar-lote", response_model=EncaminhamentoLoteOut)
+def encaminhar_em_lote(
+    payload: EncaminharLoteIn, db: Session = Depends(get_db),
+    usuario=Depends(require_permission("abrigo.gerenciar_animais")),
+):
+    """Evacuação em massa: encaminha de uma vez todos os animais ainda sem
+    ponto de apoio do abrigo (ou do município), com a menor distância
+    total aos tutores que respeita vagas, espécie e porte. Tudo numa única
+    transação. `simular=true` devolve a proposta sem gravar."""
+    resultado = svc.encaminhar_em_lote(
+        db, usuario.id, payload.abrigo_humano_id, payload.municipio_id, payload.observacao, payload.simular
+    )
+    return EncaminhamentoLoteOut(
+        simulacao=resultado["simulacao"],
+        distancia_total_km=resultado["distancia_total_km"],
+        atribuidos=[
+            EncaminhamentoLoteItemOut(
+                animal_id=item["animal"].id, animal_nome=item["animal"].nome,
+                ponto_apoio_id=item["ponto"].id, ponto_apoio_nome=item["ponto"].nome,
+                distancia_km=item["distancia_km"],
+            )
+            for item in resultado["atribuidos"]
+        ],
+        nao_atribuidos=[
+            AnimalNaoAtribuidoOut(animal_id=item["animal"].id, animal_nome=item["animal"].nome, motivo=item["motivo"])
+            for item in resultado["nao_atribuidos"]
+        ],
+    )
+
+
 @router.put("/animais/encaminhamento/{encaminhamento_id}/status", response_model=EncaminhamentoResumoOut)
 def atualizar_status(
     encaminhamento_id: UUID, payload: AtualizarStatusEncaminhamentoIn,
@@ -149,4 +234,89 @@ def criar_ponto_apoio(
     db.add(ponto)
     db.commit()
     db.refresh(ponto)
+    svc.invalidar_indice_pontos()
     return ponto
+
+
+@pontos_router.post("/reconciliar-ocupacao")
+def reconciliar_ocupacao(
+    db: Session = Depends(get_db), usuario=Depends(require_permission("abrigo.gerenciar_animais")),
+):
+    """Confere e corrige o contador de ocupação de todos os pontos de
+    apoio a partir dos encaminhamentos. Pensado para ser chamado
+    periodicamente por um agendador; retorna as divergências corrigidas."""
+    return {"divergencias": svc.reconciliar_ocupacao_pontos(db)}
+
+
+@pontos_router.on_event("startup")
+def _iniciar_stream_pontos_apoio():
+    barramento_pontos_apoio.iniciar_listen(os.environ.get("DATABASE_URL"))
+
+
+@pontos_router.get("/stream")
+def stream_ocupacao(request: Request, db: Session = Depends(get_db), usuario=Depends(get_current_user)):
+    """Server-Sent Events com a ocupação dos pontos de apoio: primeiro um
+    `snapshot` com todos os pontos ativos, depois só eventos `ocupacao`
+    dos pontos cuja ocupação, capacidade ou situação mudou — substitui o
+    polling das listas de sugestão no painel do abrigo. Se a conexão
+    perder eventos (fila cheia, LISTEN reconectado), recebe
+    `ressincronizar` e o stream termina; o EventSource reconecta e
+    recebe um snapshot novo."""
+    db.close()  # a conexão SSE fica aberta; o snapshot reabre a sessão só durante a leitura
+
+    # Último estado enviado por ponto — o cliente já tem o resto
+    ultimos = {}
+
+    def _ler_snapshot():
+        # Chamado pelo stream depois de assinar o barramento: um evento
+        # publicado durante a leitura fica na fila e não se perde
+        try:
+            snapshot = svc.estado_ocupacao_pontos(db)
+        finally:
+            db.close()
+        ultimos.update(
+            (p["ponto_apoio_id"], (p["ocupacao_atual"], p["capacidade_maxima"], p["ativo"])) for p in snapshot
+        )
+        return snapshot
+
+    def _compactar(p):
+        return {
+            "ponto_apoio_id": str(p["ponto_apoio_id"]), "ocupacao_atual": p["ocupacao_atual"],
+            "capacidade_maxima": p["capacidade_maxima"],
+            "vagas_disponiveis": max(p["capacidade_maxima"] - p["ocupacao_atual"], 0), "ativo": p["ativo"],
+        }
+
+    def _filtrar(evento):
+        ponto_id = str(evento.get("ponto_apoio_id"))
+        estado = (evento.get("ocupacao_atual"), evento.get("capacidade_maxima"), evento.get("ativo"))
+        if ultimos.get(ponto_id) == estado:
+            return None
+        ultimos[ponto_id] = estado
+        return _compactar(evento)
+
+    async def _eventos():
+        assinante = barramento_pontos_apoio.assinar()
+        _, fila = assinante
+        try:
+            snapshot = await run_in_threadpool(_ler_snapshot)
+            yield "retry: 5000\n\n"
+            dados = [{**_compactar(p), "nome": p["nome"], "tipo": p["tipo"]} for p in snapshot]
+            yield f"event: snapshot\ndata: {json.dumps(dados, default=str)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if evento is RESSINCRONIZAR:
+                    # eventos perdidos: encerra e o EventSource reabre com snapshot novo
+                    yield "event: ressincronizar\ndata: {}\n\n"
+                    return
+                payload = _filtrar(evento)
+                if payload is not None:
+                    yield f"event: ocupacao\ndata: {json.dumps(payload, default=str)}\n\n"
+        finally:
+            barramento_pontos_apoio.cancelar(assinante)
+
+    return StreamingResponse(_eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
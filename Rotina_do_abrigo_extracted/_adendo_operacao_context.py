@@ -5,23 +5,109 @@ O serviço de rotina do abrigo (rotina_abrigo_service.py) precisa resolver a
 operação ativa de um município a partir de código de serviço puro (fora do
 ciclo de vida de uma request/Depends do FastAPI). Adicione esta função aos
 imports já existentes de operacao_context.py — ela reaproveita a mesma
-`get_operacao_ativa` já implementada, apenas sem o wrapper de Dependency:
+`get_operacao_ativa` já implementada, apenas sem o wrapper de Dependency.
+
+A resolução abrigo -> município -> operação ativa é chamada a cada
+confirmação de checklist (e por qualquer outro serviço da Assistência
+Humanitária que precise herdar o operacao_id), mas a operação ativa de um
+município muda poucas vezes por ano. Os dois saltos ficam num cache por
+processo: invalidado explicitamente ao abrir/encerrar/reabrir operação
+(ou mudar o município do abrigo) por este processo, e com validade curta
+para alterações feitas por outros processos ou direto no banco.
 """
 
+import time
+from itertools import chain
 from uuid import UUID
 from typing import Optional
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from app.models.abrigo import Abrigo
+from app.models.operacao import OperacaoAssistenciaHumanitaria
 from app.services.operacao_context import get_operacao_ativa  # já existente
 
+OPERACAO_ATIVA_TTL_S = 60
+_MUNICIPIO_DO_ABRIGO = {}        # abrigo_id -> (instante, municipio_id | None)
+_OPERACAO_ATIVA_MUNICIPIO = {}   # municipio_id -> (instante, operacao_id | None)
+
+
+def invalidar_cache_operacao_ativa(municipio_id: Optional[UUID] = None, abrigo_id: Optional[UUID] = None) -> None:
+    """Chamar ao abrir, encerrar ou reabrir uma operação (municipio_id) ou
+    ao mudar o município de um abrigo (abrigo_id). Sem argumentos, descarta
+    tudo."""
+    if municipio_id is None and abrigo_id is None:
+        _MUNICIPIO_DO_ABRIGO.clear()
+        _OPERACAO_ATIVA_MUNICIPIO.clear()
+        return
+    if municipio_id is not None:
+        _OPERACAO_ATIVA_MUNICIPIO.pop(municipio_id, None)
+    if abrigo_id is not None:
+        _MUNICIPIO_DO_ABRIGO.pop(abrigo_id, None)
+
+
+def _em_cache(cache: dict, chave):
+    """(True, valor) se houver entrada válida — o valor pode ser None."""
+    entrada = cache.get(chave)
+    if entrada is not None and time.monotonic() - entrada[0] <= OPERACAO_ATIVA_TTL_S:
+        return True, entrada[1]
+    return False, None
+
+
+def get_municipio_id_do_abrigo_sync(db: Session, abrigo_id: UUID) -> Optional[UUID]:
+    encontrado, municipio_id = _em_cache(_MUNICIPIO_DO_ABRIGO, abrigo_id)
+    if not encontrado:
+        linha = db.query(Abrigo.municipio_id).filter(Abrigo.id == abrigo_id).first()
+        municipio_id = linha[0] if linha else None
+        _MUNICIPIO_DO_ABRIGO[abrigo_id] = (time.monotonic(), municipio_id)
+    return municipio_id
+
+
+def get_operacao_id_ativo_municipio_sync(db: Session, municipio_id: UUID) -> Optional[UUID]:
+    """operacao_id da operação ativa do município (ou None), via cache."""
+    encontrado, operacao_id = _em_cache(_OPERACAO_ATIVA_MUNICIPIO, municipio_id)
+    if not encontrado:
+        operacao = get_operacao_ativa(db, municipio_id)
+        operacao_id = operacao.id if operacao else None
+        _OPERACAO_ATIVA_MUNICIPIO[municipio_id] = (time.monotonic(), operacao_id)
+    return operacao_id
+
 
 def get_operacao_id_ativo_sync(db: Session, abrigo_id: UUID) -> Optional[UUID]:
     """Versão 'de serviço' (sem Depends) de get_operacao_id_ativo, para uso
     dentro de outros serviços que já têm o abrigo em mãos e precisam apenas
     do operacao_id do município ao qual ele pertence."""
-    abrigo = db.query(Abrigo).get(abrigo_id)
-    if abrigo is None:
+    municipio_id = get_municipio_id_do_abrigo_sync(db, abrigo_id)
+    if municipio_id is None:
         return None
-    operacao = get_operacao_ativa(db, abrigo.municipio_id)
-    return operacao.id if operacao else None
+    return get_operacao_id_ativo_municipio_sync(db, municipio_id)
+
+
+def _registrar_invalidacoes_operacao_ativa():
+    """Descarta o cache ao commitar operações criadas/alteradas (abertura,
+    encerramento, reabertura) ou abrigos alterados por este processo."""
+
+    @event.listens_for(Session, "after_flush")
+    def _marcar_alteracoes(session, flush_context):
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, OperacaoAssistenciaHumanitaria):
+                # operações mudam raramente: descarta o mapa inteiro, o que
+                # cobre também uma troca de município da própria operação
+                session.info["operacao_ativa_alterada"] = True
+            elif isinstance(obj, Abrigo):
+                session.info.setdefault("abrigos_alterados", set()).add(obj.id)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidar_alteracoes(session):
+        if session.info.pop("operacao_ativa_alterada", False):
+            _OPERACAO_ATIVA_MUNICIPIO.clear()
+        for abrigo_id in session.info.pop("abrigos_alterados", ()):
+            invalidar_cache_operacao_ativa(abrigo_id=abrigo_id)
+
+    @event.listens_for(Session, "after_rollback")
+    def _descartar_alteracoes(session):
+        session.info.pop("operacao_ativa_alterada", None)
+        session.info.pop("abrigos_alterados", None)
+
+
+_registrar_invalidacoes_operacao_ativa()
@@ -0,0 +1,151 @@
+"""
+Outbox transacional do Diário Operacional.
+
+Os serviços não chamam mais registrar_diario no caminho da request: a
+entrada do Diário é gravada em `operacao_diario_outbox` na mesma
+transação (e no mesmo commit) da alteração que a originou, e um worker
+em thread do backend repassa os pendentes para registrar_diario.
+
+Worker:
+- reserva um lote de pendentes com FOR UPDATE SKIP LOCKED, empurrando
+  disponivel_em para o fim da reserva (vários processos podem rodar o
+  worker sem pegar a mesma linha; se o processo morrer, a linha volta a
+  ficar disponível quando a reserva expira);
+- para cada linha, marca processado_em e chama registrar_diario, e as
+  duas escritas vão no mesmo commit — a entrada aparece no Diário uma
+  vez só, mesmo que registrar_diario faça o próprio commit;
+- em caso de erro, agenda nova tentativa com backoff exponencial; depois
+  de MAX_TENTATIVAS a linha fica parada com ultimo_erro para análise.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import column, insert, table, text
+from sqlalchemy.orm import Session
+
+LOTE = 100
+INTERVALO_S = 5
+RESERVA_S = 120
+MAX_TENTATIVAS = 10
+BACKOFF_BASE_S = 10
+BACKOFF_MAX_S = 3600
+
+_OUTBOX = table(
+    "operacao_diario_outbox",
+    column("operacao_id"), column("descricao"), column("origem"),
+    column("entidade_referencia"), column("entidade_referencia_id"),
+)
+
+SQL_RESERVAR = text("""
+    UPDATE operacao_diario_outbox o
+       SET disponivel_em = now() + make_interval(secs => :reserva_s),
+           tentativas = o.tentativas + 1
+     WHERE o.id IN (
+           SELECT id FROM operacao_diario_outbox
+            WHERE processado_em IS NULL AND disponivel_em <= now() AND tentativas < :max_tentativas
+            ORDER BY criado_em
+            LIMIT :lote
+              FOR UPDATE SKIP LOCKED)
+    RETURNING o.id, o.operacao_id, o.descricao, o.origem, o.entidade_referencia,
+              o.entidade_referencia_id, o.tentativas, o.criado_em
+""")
+SQL_PROCESSADO = text("UPDATE operacao_diario_outbox SET processado_em = now(), ultimo_erro = NULL WHERE id = :id")
+SQL_FALHA = text("""
+    UPDATE operacao_diario_outbox
+       SET disponivel_em = now() + make_interval(secs => :espera_s), ultimo_erro = :erro
+     WHERE id = :id
+""")
+
+
+def enfileirar_diario(
+    db: Session,
+    operacao_id: UUID,
+    entradas: Iterable[Tuple[str, Optional[str], Optional[UUID]]],
+    origem: str = "automatico",
+) -> None:
+    """Grava (descricao, entidade_referencia, entidade_referencia_id) no
+    outbox com um único INSERT, na transação corrente — sem commit: quem
+    chama faz o commit junto com a alteração que originou as entradas."""
+    linhas = [
+        {
+            "operacao_id": str(operacao_id),
+            "descricao": descricao,
+            "origem": origem,
+            "entidade_referencia": entidade_referencia,
+            "entidade_referencia_id": str(entidade_id) if entidade_id else None,
+        }
+        for descricao, entidade_referencia, entidade_id in entradas
+    ]
+    if linhas:
+        db.execute(insert(_OUTBOX), linhas)
+
+
+class WorkerOutboxDiario:
+    def __init__(self):
+        self._acordar = threading.Event()
+        self._thread = None
+
+    def acordar(self):
+        """Chamado pelos serviços após o commit, para não esperar o intervalo."""
+        self._acordar.set()
+
+    @property
+    def rodando(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def drenar(self, db: Session) -> int:
+        """Processa um lote; devolve quantas linhas foram reservadas."""
+        from app.services.operacao_service import registrar_diario
+        from app.models.operacao import OrigemDiario
+
+        reservadas = db.execute(
+            SQL_RESERVAR, {"reserva_s": RESERVA_S, "max_tentativas": MAX_TENTATIVAS, "lote": LOTE}
+        ).fetchall()
+        db.commit()
+
+        for linha in sorted(reservadas, key=lambda r: r.criado_em):
+            try:
+                db.execute(SQL_PROCESSADO, {"id": linha.id})
+                registrar_diario(
+                    db, linha.operacao_id, linha.descricao, OrigemDiario(linha.origem),
+                    entidade_referencia=linha.entidade_referencia,
+                    entidade_referencia_id=linha.entidade_referencia_id,
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                espera = min(BACKOFF_BASE_S * 2 ** (linha.tentativas - 1), BACKOFF_MAX_S)
+                db.execute(SQL_FALHA, {"id": linha.id, "espera_s": espera, "erro": str(e)[:1000]})
+                db.commit()
+                if linha.tentativas >= MAX_TENTATIVAS:
+                    print(f"Aviso: entrada {linha.id} do outbox do Diário desistida após {linha.tentativas} tentativas: {e}")
+        return len(reservadas)
+
+    def iniciar(self, session_factory) -> bool:
+        """Inicia (uma vez por processo) a thread que drena o outbox."""
+        if self.rodando:
+            return False
+
+        def _loop():
+            while True:
+                try:
+                    db = session_factory()
+                    try:
+                        while self.drenar(db) == LOTE:
+                            pass
+                    finally:
+                        db.close()
+                except Exception as e:
+                    print(f"Aviso: worker do outbox do Diário: {e}")
+                self._acordar.wait(INTERVALO_S)
+                self._acordar.clear()
+
+        self._thread = threading.Thread(target=_loop, name="diario-outbox", daemon=True)
+        self._thread.start()
+        return True
+
+
+worker_outbox_diario = WorkerOutboxDiario()
@@ -70,6 +70,15 @@ class ConfirmarExecucaoIn(BaseModel):
     observacao: Optional[str] = None
 
 
+class ConfirmarExecucaoLoteItemIn(ConfirmarExecucaoIn):
+    rotina_item_id: UUID
+
+
+class ConfirmarExecucoesLoteIn(BaseModel):
+    data_referencia: Optional[date] = None  # None = hoje
+    itens: List[ConfirmarExecucaoLoteItemIn] = Field(..., min_items=1)
+
+
 class ExecucaoOut(BaseModel):
     id: UUID
     rotina_item_id: UUID
@@ -8,7 +8,8 @@ Responsabilidades:
 3. Confirmação diária de execução de cada item — evidência para
    auditoria e, quando houver operação ativa, também para o Diário
    Operacional daquela operação (mesmo padrão de vínculo transversal já
-   usado no restante do módulo de Assistência Humanitária).
+   usado no restante do módulo de Assistência Humanitária), via outbox
+   gravado no mesmo commit (ver diario_outbox.py).
 4. Geração do "Mural da Rotina" (PDF) — rotina + regras de convivência,
    pronto para impressão e afixação em local visível do abrigo, conforme
    exigido pela doutrina.
@@ -17,7 +18,7 @@ from __future__ import annotations
 
 import io
 from datetime import date, datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException, status
@@ -26,6 +27,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.models.abrigo import Abrigo
@@ -34,6 +37,7 @@ from app.models.rotina_abrigo import (
     CatalogoRotinaPadraoAbrigo, CatalogoRegraConvivenciaPadrao,
     StatusExecucaoRotina,
 )
+from app.services.diario_outbox import enfileirar_diario, worker_outbox_diario
 from app.services.operacao_context import get_operacao_id_ativo_sync  # variante não-Depends, ver nota
 
 DIAS_SEMANA_PT = ["Domingo", "Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado"]
@@ -136,6 +140,33 @@ def obter_execucao_do_dia(
     )
 
 
+def listar_rotina_do_dia(
+    db: Session, abrigo_id: UUID, data_referencia: date
+) -> List[Tuple[AbrigoRotinaItem, Optional[AbrigoRotinaExecucao]]]:
+    """Itens ativos da rotina com a execução do dia (ou None), numa única
+    consulta — LEFT JOIN em (rotina_item_id, data_referencia), coberto
+    pela UNIQUE da tabela de execuções. Substitui o obter_execucao_do_dia
+    por item no checklist diário."""
+    return (
+        db.query(AbrigoRotinaItem, AbrigoRotinaExecucao)
+        .outerjoin(
+            AbrigoRotinaExecucao,
+            and_(
+                AbrigoRotinaExecucao.rotina_item_id == AbrigoRotinaItem.id,
+                AbrigoRotinaExecucao.data_referencia == data_referencia,
+            ),
+        )
+        .filter(AbrigoRotinaItem.abrigo_id == abrigo_id, AbrigoRotinaItem.ativo.is_(True))
+        .order_by(AbrigoRotinaItem.horario_inicio)
+        .all()
+    )
+
+
+def _texto_diario_execucao(item: AbrigoRotinaItem, novo_status: StatusExecucaoRotina, abrigo_nome: str) -> str:
+    rotulo = "cumprida" if novo_status == StatusExecucaoRotina.REALIZADA else "não cumprida"
+    return f"Rotina '{item.atividade}' marcada como {rotulo} ({abrigo_nome})."
+
+
 def confirmar_execucao(
     db: Session,
     rotina_item_id: UUID,
@@ -170,22 +201,106 @@ def confirmar_execucao(
     execucao.data_hora_confirmacao = datetime.utcnow()
     execucao.observacao = observacao
 
+    if operacao_id:
+        # a entrada do Diário vai para o outbox no mesmo commit da
+        # execução; o worker a repassa para registrar_diario depois
+        db.flush()
+        enfileirar_diario(db, operacao_id, [
+            (_texto_diario_execucao(item, novo_status, item.abrigo.nome), "rotina_execucao", execucao.id),
+        ])
+
     db.commit()
     db.refresh(execucao)
-
     if operacao_id:
-        from app.services.operacao_service import registrar_diario
-        from app.models.operacao import OrigemDiario
-        rotulo = "cumprida" if novo_status == StatusExecucaoRotina.REALIZADA else "não cumprida"
-        registrar_diario(
-            db, operacao_id,
-            f"Rotina '{item.atividade}' marcada como {rotulo} ({item.abrigo.nome}).",
-            OrigemDiario.AUTOMATICO,
-            entidade_referencia="rotina_execucao",
-            entidade_referencia_id=execucao.id,
+        worker_outbox_diario.acordar()
+    return execucao
+
+
+def confirmar_execucoes_em_lote(
+    db: Session,
+    abrigo_id: UUID,
+    confirmacoes: List[Tuple[UUID, StatusExecucaoRotina, Optional[str]]],
+    usuario_id: UUID,
+    data_referencia: Optional[date] = None,
+) -> List[AbrigoRotinaExecucao]:
+    """Fechamento de turno: aplica vários (rotina_item_id, status,
+    observacao) de um mesmo abrigo e dia numa única transação. Itens,
+    execuções já existentes e operação ativa são resolvidos uma vez para
+    o lote todo, e as entradas do Diário Operacional entram no outbox
+    num único INSERT antes do commit — ou grava tudo, ou nada. Se o mesmo
+    item vier repetido, vale a última confirmação."""
+    abrigo = db.query(Abrigo).get(abrigo_id)
+    if abrigo is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Abrigo não encontrado.")
+
+    por_item = {item_id: (novo_status, observacao) for item_id, novo_status, observacao in confirmacoes}
+    itens = {
+        i.id: i for i in db.query(AbrigoRotinaItem).filter(
+            AbrigoRotinaItem.id.in_(list(por_item)),
+            AbrigoRotinaItem.abrigo_id == abrigo_id,
+            AbrigoRotinaItem.ativo.is_(True),
+        )
+    }
+    faltando = [str(i) for i in por_item if i not in itens]
+    if faltando:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND,
+            f"Itens de rotina não encontrados neste abrigo: {', '.join(faltando)}.",
         )
 
-    return execucao
+    data_referencia = data_referencia or date.today()
+    existentes = {
+        e.rotina_item_id: e for e in db.query(AbrigoRotinaExecucao).filter(
+            AbrigoRotinaExecucao.rotina_item_id.in_(list(itens)),
+            AbrigoRotinaExecucao.data_referencia == data_referencia,
+        )
+    }
+    operacao_id = get_operacao_id_ativo_sync(db, abrigo_id)
+    agora = datetime.utcnow()
+
+    execucoes, novas = [], []
+    for item_id, (novo_status, observacao) in por_item.items():
+        execucao = existentes.get(item_id)
+        if execucao is None:
+            execucao = AbrigoRotinaExecucao(
+                rotina_item_id=item_id,
+                data_referencia=data_referencia,
+                operacao_id=operacao_id,
+            )
+            novas.append(execucao)
+        execucao.status = novo_status
+        execucao.usuario_id = usuario_id
+        execucao.data_hora_confirmacao = agora
+        execucao.observacao = observacao
+        execucoes.append(execucao)
+    db.add_all(novas)
+
+    try:
+        db.flush()  # ids das execuções novas, referenciados pelo Diário
+        if operacao_id:
+            enfileirar_diario(db, operacao_id, [
+                (_texto_diario_execucao(itens[e.rotina_item_id], e.status, abrigo.nome), "rotina_execucao", e.id)
+                for e in execucoes
+            ])
+        ids = [e.id for e in execucoes]
+        db.commit()
+    except IntegrityError:
+        # outro operador confirmou um destes itens no mesmo dia entre a
+        # leitura e o commit (UNIQUE rotina_item_id + data_referencia)
+        db.rollback()
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            "Parte dos itens foi confirmada por outro operador ao mesmo tempo; recarregue o checklist.",
+        )
+    if operacao_id:
+        worker_outbox_diario.acordar()
+    # o commit expira as instâncias: recarrega todas numa consulta só, em
+    # vez de um refresh por execução
+    return (
+        db.query(AbrigoRotinaExecucao)
+        .filter(AbrigoRotinaExecucao.id.in_(ids))
+        .all()
+    )
 
 
 # ---------------------------------------------------------------------
@@ -12,19 +12,25 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import io
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db  # ajustar à fábrica de sessões real do projeto
 from app.security.auth import get_current_user, require_permission
 from app.models.rotina_abrigo import CatalogoRotinaPadraoAbrigo, StatusExecucaoRotina
 from app.schemas.rotina_abrigo import (
     RotinaPadraoOut, RotinaItemIn, RotinaItemOut, RotinaItemComExecucaoOut,
-    AplicarModeloPadraoIn, ConfirmarExecucaoIn, ExecucaoOut,
+    AplicarModeloPadraoIn, ConfirmarExecucaoIn, ConfirmarExecucoesLoteIn, ExecucaoOut,
     RegraConvivenciaIn, RegraConvivenciaOut,
 )
 from app.services import rotina_abrigo_service as svc
+from app.services.diario_outbox import worker_outbox_diario
 
 router = APIRouter(tags=["Abrigos - Rotina"])
 
 
+@router.on_event("startup")
+def _iniciar_outbox_diario():
+    worker_outbox_diario.iniciar(SessionLocal)
+
+
 @router.get("/catalogo-rotina-padrao", response_model=List[RotinaPadraoOut])
 def listar_catalogo_rotina(db: Session = Depends(get_db), usuario=Depends(get_current_user)):
     return db.query(CatalogoRotinaPadraoAbrigo).order_by(CatalogoRotinaPadraoAbrigo.ordem_padrao).all()
@@ -54,16 +60,12 @@ def listar_rotina_do_dia(
     informado (ou de hoje, se data_referencia não for passada) — usado
     tanto para exibir a grade quanto para o checklist diário."""
     dia = data_referencia or date.today()
-    itens = svc.listar_rotina(db, abrigo_id)
     resultado = []
-    for item in itens:
-        execucao = svc.obter_execucao_do_dia(db, item.id, dia)
-        resultado.append(
-            RotinaItemComExecucaoOut(
-                **RotinaItemOut.from_orm(item).dict(),
-                execucao_hoje=ExecucaoOut.from_orm(execucao) if execucao else None,
-            )
-        )
+    for item, execucao in svc.listar_rotina_do_dia(db, abrigo_id, dia):
+        saida = RotinaItemComExecucaoOut.from_orm(item)
+        if execucao is not None:
+            saida.execucao_hoje = ExecucaoOut.from_orm(execucao)
+        resultado.append(saida)
     return resultado
 
 
@@ -96,6 +98,10 @@ def remover_item_rotina(
     svc.remover_item_rotina(db, item_id)
 
 
+def _status_execucao(valor: str) -> StatusExecucaoRotina:
+    return StatusExecucaoRotina.REALIZADA if valor == "realizada" else StatusExecucaoRotina.NAO_REALIZADA
+
+
 @router.post("/rotina/{item_id}/confirmar", response_model=ExecucaoOut)
 def confirmar_execucao(
     item_id: UUID,
@@ -107,11 +113,21 @@ def confirmar_execucao(
     da rotina como cumprido ou não cumprido. Se o abrigo estiver
     vinculado a uma operação ativa, o registro também aparece
     automaticamente no Diário Operacional daquela operação."""
-    novo_status = (
-        StatusExecucaoRotina.REALIZADA if payload.status == "realizada"
-        else StatusExecucaoRotina.NAO_REALIZADA
-    )
-    return svc.confirmar_execucao(db, item_id, novo_status, usuario.id, payload.observacao)
+    return svc.confirmar_execucao(db, item_id, _status_execucao(payload.status), usuario.id, payload.observacao)
+
+
+@router.post("/{abrigo_id}/rotina/confirmar-lote", response_model=List[ExecucaoOut])
+def confirmar_execucoes_em_lote(
+    abrigo_id: UUID,
+    payload: ConfirmarExecucoesLoteIn,
+    db: Session = Depends(get_db),
+    usuario=Depends(get_current_user),
+):
+    """Fechamento de turno — marca vários itens do checklist do dia de
+    uma vez, numa única transação (tudo ou nada). As entradas do Diário
+    Operacional, quando há operação ativa, são gravadas juntas."""
+    confirmacoes = [(i.rotina_item_id, _status_execucao(i.status), i.observacao) for i in payload.itens]
+    return svc.confirmar_execucoes_em_lote(db, abrigo_id, confirmacoes, usuario.id, payload.data_referencia)
 
 
 @router.get("/{abrigo_id}/regras-convivencia", response_model=List[RegraConvivenciaOut])
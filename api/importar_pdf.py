@@ -5,6 +5,8 @@ import pdfplumber
 import re
 import traceback
 
+from api.utils.logradouros_index import get_indice_logradouros, casar_logradouro
+
 app = FastAPI()
 handler = app
 
@@ -16,6 +18,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Índice de logradouros montado uma vez por instância (cold start), não por request
+get_indice_logradouros()
+
 def extrair_campo(texto, label_inicio, label_fim=None):
     padrao = re.escape(label_inicio) + r"(.*?)(?=" + (re.escape(label_fim) if label_fim else r"\n|$)")
     match = re.search(padrao, texto, re.IGNORECASE | re.DOTALL)
@@ -73,6 +78,13 @@ async def importar_pdf(file: UploadFile = File(...), full_path: str = None):
             campos["municipio"] = match_municipio.group(1).strip() if match_municipio else None
             campos["bairro"] = match_bairro.group(1).strip() if match_bairro else None
             campos["rua"] = match_rua.group(1).strip() if match_rua else None
+
+            # Logradouro oficial correspondente (base municipal), se houver
+            logradouro = casar_logradouro(campos["rua"]) if campos["rua"] else None
+            campos["logradouro_id"] = logradouro["logradouro_id"] if logradouro else None
+            campos["logradouro_oficial"] = logradouro["nome"] if logradouro else None
+            campos["logradouro_score"] = logradouro["score"] if logradouro else None
+            campos["logradouro_busca_us"] = logradouro["tempo_busca_us"] if logradouro else None
         
             # Referência
             match_ref = re.search(r"Referência\n(.*?)\n", text, re.IGNORECASE)
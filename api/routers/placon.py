@@ -1,8 +1,25 @@
 # api/routers/placon.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import case, event, func, text
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import List, Optional
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from itertools import chain
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from api.utils.placon_eventos import RESSINCRONIZAR, barramento_placon
 
 # Dependências condicionais para ambientes com SQLAlchemy configurado
 try:
@@ -20,6 +37,47 @@ except ImportError:
 router = APIRouter(prefix="/placon", tags=["Plano de Contingência"])
 
 
+# ---------------------------------------------------------------------
+# Cache de vínculos usuário <-> órgão: (tenant_id, usuario_id) ->
+# {orgao_id: papel}. TTL curto e invalidação no commit de qualquer
+# alteração em PlaconUsuarioOrgao (ver listeners ao fim do módulo).
+# ---------------------------------------------------------------------
+VINCULOS_TTL_S = 30
+
+_VINCULOS_CACHE = {}
+
+
+def invalidar_cache_vinculos(tenant_id=None, usuario_id=None):
+    """Descarta os vínculos em cache do usuário (ou de todos, se None)."""
+    if usuario_id is None:
+        _VINCULOS_CACHE.clear()
+    else:
+        _VINCULOS_CACHE.pop((str(tenant_id), str(usuario_id)), None)
+
+
+def _vinculos_do_usuario(db: Session, user) -> dict:
+    """Todos os vínculos do usuário no tenant, numa única consulta."""
+    chave = (str(user.tenant_id), str(user.id))
+    entrada = _VINCULOS_CACHE.get(chave)
+    if entrada is not None and time.monotonic() - entrada[0] <= VINCULOS_TTL_S:
+        return entrada[1]
+
+    vinculos = dict(
+        db.query(models.PlaconUsuarioOrgao.orgao_id, models.PlaconUsuarioOrgao.papel)
+          .filter_by(usuario_id=user.id, tenant_id=user.tenant_id)
+          .all()
+    )
+    _VINCULOS_CACHE[chave] = (time.monotonic(), vinculos)
+    return vinculos
+
+
+def _exigir_acesso_orgao(db: Session, user, orgao_id: UUID) -> None:
+    """Acesso restrito ao próprio órgão, salvo papel coordenador_compdec."""
+    vinculos = _vinculos_do_usuario(db, user)
+    if orgao_id not in vinculos and "coordenador_compdec" not in vinculos.values():
+        raise HTTPException(403, "Acesso restrito ao seu próprio órgão")
+
+
 @router.get("/meu-orgao")
 def get_meu_orgao(db: Session = Depends(get_db), user=Depends(get_current_user)):
     """
@@ -42,17 +100,7 @@ def get_orgao(orgao_id: UUID, db: Session = Depends(get_db),
     contatos e recursos (com disponibilidade lida em tempo real do MCI).
     Acesso restrito ao próprio órgão, salvo papel coordenador_compdec.
     """
-    # Verificar se o usuário tem acesso a este órgão
-    is_coord = db.query(models.PlaconUsuarioOrgao).filter_by(
-        usuario_id=user.id, tenant_id=user.tenant_id,
-        papel="coordenador_compdec"
-    ).first()
-    if not is_coord:
-        vinculo = db.query(models.PlaconUsuarioOrgao).filter_by(
-            usuario_id=user.id, orgao_id=orgao_id, tenant_id=user.tenant_id
-        ).first()
-        if not vinculo:
-            raise HTTPException(403, "Acesso restrito ao seu próprio órgão")
+    _exigir_acesso_orgao(db, user, orgao_id)
 
     orgao = db.query(models.PlaconOrgao).filter_by(
         id=orgao_id, tenant_id=user.tenant_id
@@ -60,7 +108,7 @@ def get_orgao(orgao_id: UUID, db: Session = Depends(get_db),
     if not orgao:
         raise HTTPException(404, "Órgão não encontrado")
 
-    # Buscar atribuições, contatos e recursos com disponibilidade do MCI
+    # Buscar atribuições e contatos do órgão
     atribuicoes = db.query(models.PlaconAtribuicao)\
                     .filter_by(orgao_id=orgao_id, tenant_id=user.tenant_id)\
                     .order_by(models.PlaconAtribuicao.fase, models.PlaconAtribuicao.ordem)\
@@ -70,24 +118,26 @@ def get_orgao(orgao_id: UUID, db: Session = Depends(get_db),
                  .filter_by(orgao_id=orgao_id, tenant_id=user.tenant_id)\
                  .all()
 
-    recursos = db.query(models.PlaconRecurso)\
-                 .filter_by(orgao_id=orgao_id, tenant_id=user.tenant_id)\
+    # Recursos já com a disponibilidade em tempo real do MCI, numa única
+    # consulta (LEFT JOIN) em vez de uma ida ao MCI por recurso
+    recursos = db.query(models.PlaconRecurso, models.MciRecurso.quantidade_disponivel)\
+                 .outerjoin(models.MciRecurso,
+                            models.MciRecurso.id == models.PlaconRecurso.mci_recurso_id)\
+                 .filter(models.PlaconRecurso.orgao_id == orgao_id,
+                         models.PlaconRecurso.tenant_id == user.tenant_id)\
                  .all()
 
-    # Para cada recurso, buscar disponibilidade em tempo real no MCI
-    recursos_com_mci = []
-    for r in recursos:
-        disponivel = db.query(models.MciRecurso.quantidade_disponivel)\
-                       .filter_by(id=r.mci_recurso_id)\
-                       .scalar() if r.mci_recurso_id else None
-        recursos_com_mci.append({
+    recursos_com_mci = [
+        {
             "id": r.id,
             "mci_recurso_id": r.mci_recurso_id,
             "categoria": r.categoria,
             "nome_recurso": r.nome_recurso,
             "alocado_plano": r.alocado_plano,
             "disponivel_mci": disponivel,
-        })
+        }
+        for r, disponivel in recursos
+    ]
 
     return {
         "orgao": orgao,
@@ -101,6 +151,104 @@ def get_orgao(orgao_id: UUID, db: Session = Depends(get_db),
     }
 
 
+class AlocacaoRecursoItem(BaseModel):
+    recurso_id: UUID
+    alocado: int = Field(..., ge=0)
+
+
+class AlocarRecursosLoteBody(BaseModel):
+    alocacoes: List[AlocacaoRecursoItem] = Field(..., min_items=1)
+
+
+def _aplicar_alocacoes(db: Session, user, alocacoes: dict) -> list:
+    """
+    Aplica {recurso_id: alocado} numa única transação, com os recursos e
+    as linhas do MCI travados (SELECT ... FOR UPDATE, sempre na ordem dos
+    ids para evitar deadlock). Coordenadores alocando o mesmo recurso ao
+    mesmo tempo são serializados: o segundo só lê a disponibilidade depois
+    que o primeiro commitar. Não faz commit — quem chama decide.
+
+    Devolve dicts simples ({id, tenant_id, orgao_id, alocado_plano}) em vez
+    das instâncias: depois do commit (expire_on_commit) cada atributo lido
+    de uma instância custaria um SELECT de refresh por recurso.
+    """
+    recursos = db.query(models.PlaconRecurso)\
+                 .filter(models.PlaconRecurso.id.in_(list(alocacoes)),
+                         models.PlaconRecurso.tenant_id == user.tenant_id)\
+                 .order_by(models.PlaconRecurso.id)\
+                 .with_for_update().all()
+    faltando = set(alocacoes) - {r.id for r in recursos}
+    if faltando:
+        raise HTTPException(404, f"Recurso não encontrado: {', '.join(sorted(map(str, faltando)))}")
+
+    # Verificar disponibilidade no MCI antes de aceitar
+    mci_ids = {r.mci_recurso_id for r in recursos if r.mci_recurso_id}
+    disponivel_por_mci = {}
+    if mci_ids:
+        disponivel_por_mci = dict(
+            db.query(models.MciRecurso.id, models.MciRecurso.quantidade_disponivel)
+              .filter(models.MciRecurso.id.in_(list(mci_ids)))
+              .order_by(models.MciRecurso.id)
+              .with_for_update().all()
+        )
+    # O total alocado no plano contra a mesma linha do MCI (inclusive por
+    # recursos fora deste lote) não pode passar da disponibilidade. Todo
+    # alocador trava a linha do MCI antes de ler, então a soma é estável.
+    # Reduções são sempre aceitas, mesmo com o MCI já abaixo do alocado.
+    outros_por_mci = {}
+    if mci_ids:
+        outros_por_mci = dict(
+            db.query(models.PlaconRecurso.mci_recurso_id, func.sum(models.PlaconRecurso.alocado_plano))
+              .filter(models.PlaconRecurso.mci_recurso_id.in_(list(mci_ids)),
+                      ~models.PlaconRecurso.id.in_(list(alocacoes)))
+              .group_by(models.PlaconRecurso.mci_recurso_id).all()
+        )
+    antes_por_mci, depois_por_mci, nome_por_mci = defaultdict(int), defaultdict(int), {}
+    for r in recursos:
+        if r.mci_recurso_id:
+            antes_por_mci[r.mci_recurso_id] += r.alocado_plano or 0
+            depois_por_mci[r.mci_recurso_id] += alocacoes[r.id]
+            nome_por_mci.setdefault(r.mci_recurso_id, r.nome_recurso)
+    for mci_id, depois in depois_por_mci.items():
+        disponivel = disponivel_por_mci.get(mci_id) or 0
+        outros = int(outros_por_mci.get(mci_id) or 0)
+        if outros + depois > disponivel and depois > antes_por_mci[mci_id]:
+            detalhe = f" ({outros} já alocadas em outros recursos do plano)" if outros else ""
+            raise HTTPException(
+                422, f"MCI indica apenas {disponivel} unidades disponíveis para "
+                     f"'{nome_por_mci[mci_id]}'{detalhe}")
+
+    # Log de auditoria (inserido em lote no flush do commit)
+    db.add_all([
+        models.PlaconRecursoLog(
+            tenant_id=user.tenant_id,
+            recurso_id=r.id,
+            usuario_id=user.id,
+            alocado_antes=r.alocado_plano,
+            alocado_depois=alocacoes[r.id],
+        )
+        for r in recursos
+    ])
+
+    aplicadas = []
+    for r in recursos:
+        r.alocado_plano = alocacoes[r.id]
+        aplicadas.append({"id": r.id, "tenant_id": r.tenant_id,
+                          "orgao_id": r.orgao_id, "alocado_plano": r.alocado_plano})
+    return aplicadas
+
+
+def _publicar_alocacoes(aplicadas) -> None:
+    """Publica as alocações já commitadas no stream dos painéis (substituto
+    local do NOTIFY do Postgres — ver api/utils/placon_eventos.py)."""
+    for a in aplicadas:
+        barramento_placon.publicar({
+            "tipo": "alocado_plano", "tenant_id": str(a["tenant_id"]),
+            "orgao_id": str(a["orgao_id"]), "recurso_id": str(a["id"]),
+            "valor": a["alocado_plano"],
+        })
+
+
 @router.patch("/recursos/{recurso_id}/alocar")
 def alocar_recurso(recurso_id: UUID, body: schemas.AlocarRecursoBody if schemas else None,
                    db: Session = Depends(get_db), user=Depends(get_current_user)):
@@ -108,61 +256,492 @@ def alocar_recurso(recurso_id: UUID, body: schemas.AlocarRecursoBody if schemas
     Atualiza a quantidade alocada de um recurso no plano.
     Grava log de auditoria obrigatório.
     """
-    recurso = db.query(models.PlaconRecurso).filter_by(
-        id=recurso_id, tenant_id=user.tenant_id
+    aplicada, = _aplicar_alocacoes(db, user, {recurso_id: body.alocado})
+    db.commit()
+    _publicar_alocacoes([aplicada])
+    return {"ok": True, "alocado_plano": aplicada["alocado_plano"]}
+
+
+@router.patch("/recursos/alocar-lote")
+def alocar_recursos_lote(body: AlocarRecursosLoteBody, db: Session = Depends(get_db),
+                         user=Depends(get_current_user)):
+    """
+    Aplica várias alocações numa única transação (tudo ou nada), com um
+    log de auditoria por recurso. Se o mesmo recurso vier repetido, vale
+    a última quantidade informada.
+    """
+    alocacoes = {item.recurso_id: item.alocado for item in body.alocacoes}
+    aplicadas = _aplicar_alocacoes(db, user, alocacoes)
+    db.commit()
+    _publicar_alocacoes(aplicadas)
+    return {
+        "ok": True,
+        "recursos": [{"id": a["id"], "alocado_plano": a["alocado_plano"]} for a in aplicadas],
+    }
+
+
+@router.get("/prontidao-recursos")
+def get_prontidao_recursos(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Painel de prontidão do plano: para cada órgão e categoria de recurso,
+    total alocado no plano x total disponível no MCI, com sinalização de
+    déficit. Calculado numa única consulta agrupada. Restrito ao papel
+    coordenador_compdec (visão de todos os órgãos).
+    """
+    if "coordenador_compdec" not in _vinculos_do_usuario(db, user).values():
+        raise HTTPException(403, "Painel restrito à coordenação da COMPDEC")
+
+    disponivel = func.coalesce(models.MciRecurso.quantidade_disponivel, 0)
+    linhas = db.query(
+                 models.PlaconOrgao.id,
+                 models.PlaconOrgao.nome_curto,
+                 models.PlaconRecurso.categoria,
+                 func.count(models.PlaconRecurso.id),
+                 func.sum(models.PlaconRecurso.alocado_plano),
+                 func.sum(disponivel),
+                 func.sum(case((models.PlaconRecurso.alocado_plano > disponivel, 1), else_=0)),
+             )\
+             .join(models.PlaconRecurso,
+                   (models.PlaconRecurso.orgao_id == models.PlaconOrgao.id)
+                   & (models.PlaconRecurso.tenant_id == models.PlaconOrgao.tenant_id))\
+             .outerjoin(models.MciRecurso,
+                        models.MciRecurso.id == models.PlaconRecurso.mci_recurso_id)\
+             .filter(models.PlaconOrgao.tenant_id == user.tenant_id,
+                     models.PlaconOrgao.ativo.is_(True))\
+             .group_by(models.PlaconOrgao.id, models.PlaconOrgao.nome_curto,
+                       models.PlaconOrgao.ordem, models.PlaconRecurso.categoria)\
+             .order_by(models.PlaconOrgao.ordem, models.PlaconRecurso.categoria)\
+             .all()
+
+    orgaos = {}
+    for orgao_id, nome_curto, categoria, qtd, alocado, disp, em_deficit in linhas:
+        painel = orgaos.setdefault(orgao_id, {
+            "orgao_id": orgao_id, "nome_curto": nome_curto,
+            "deficit": False, "categorias": [],
+        })
+        painel["categorias"].append({
+            "categoria": categoria,
+            "recursos": qtd,
+            "alocado_plano": int(alocado or 0),
+            "disponivel_mci": int(disp or 0),
+            "recursos_em_deficit": int(em_deficit or 0),
+            "deficit": bool(em_deficit),
+        })
+        painel["deficit"] = painel["deficit"] or bool(em_deficit)
+
+    return list(orgaos.values())
+
+
+@router.get("/recursos/historico/estado")
+def get_estado_recursos_em(instante: datetime, db: Session = Depends(get_db),
+                           user=Depends(get_current_user)):
+    """
+    Alocação de todos os recursos do plano num instante passado (ex.: "o
+    que estava alocado às 03:00 durante a enchente"). Lê o último
+    checkpoint anterior ao instante e aplica só os eventos do log entre
+    ele e o instante. Sem checkpoint, calcula direto no banco a partir do
+    log indexado (ver placon_estado_recursos_em). Restrito ao papel
+    coordenador_compdec.
+    """
+    if "coordenador_compdec" not in _vinculos_do_usuario(db, user).values():
+        raise HTTPException(403, "Histórico restrito à coordenação da COMPDEC")
+
+    checkpoint = db.execute(
+        text("SELECT tomado_em, estado FROM placon_recursos_checkpoint "
+             "WHERE tenant_id = :tenant_id AND tomado_em <= :instante "
+             "ORDER BY tomado_em DESC LIMIT 1"),
+        {"tenant_id": user.tenant_id, "instante": instante},
     ).first()
-    if not recurso:
-        raise HTTPException(404, "Recurso não encontrado")
 
-    # Verificar disponibilidade no MCI antes de aceitar
-    if recurso.mci_recurso_id:
-        disponivel = db.query(models.MciRecurso.quantidade_disponivel)\
-                       .filter_by(id=recurso.mci_recurso_id).scalar()
-        if body.alocado > disponivel:
-            raise HTTPException(422, f"MCI indica apenas {disponivel} unidades disponíveis")
-
-    # Log de auditoria
-    db.add(models.PlaconRecursoLog(
-        tenant_id=user.tenant_id,
-        recurso_id=recurso_id,
-        usuario_id=user.id,
-        alocado_antes=recurso.alocado_plano,
-        alocado_depois=body.alocado,
-    ))
-
-    recurso.alocado_plano = body.alocado
+    if checkpoint is None:
+        estado = db.execute(
+            text("SELECT placon_estado_recursos_em(:tenant_id, :instante)"),
+            {"tenant_id": user.tenant_id, "instante": instante},
+        ).scalar()
+        return {"instante": instante, "checkpoint_em": None,
+                "eventos_aplicados": 0, "recursos": estado}
+
+    # Recursos criados depois do checkpoint só aparecem a partir do
+    # primeiro evento de alocação registrado no log
+    estado = dict(checkpoint.estado)
+    eventos = db.query(models.PlaconRecursoLog.recurso_id, models.PlaconRecursoLog.alocado_depois)\
+                .filter(models.PlaconRecursoLog.tenant_id == user.tenant_id,
+                        models.PlaconRecursoLog.created_at > checkpoint.tomado_em,
+                        models.PlaconRecursoLog.created_at <= instante)\
+                .order_by(models.PlaconRecursoLog.created_at)\
+                .all()
+    for recurso_id, alocado_depois in eventos:
+        estado[str(recurso_id)] = alocado_depois
+
+    return {"instante": instante, "checkpoint_em": checkpoint.tomado_em,
+            "eventos_aplicados": len(eventos), "recursos": estado}
+
+
+@router.post("/recursos/historico/checkpoint")
+def gravar_checkpoint_recursos(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Grava um checkpoint da alocação de todos os recursos do tenant, fora
+    do ciclo normal. Os checkpoints periódicos, que mantêm curto o trecho
+    do log que a consulta histórica precisa reaplicar, são agendados no
+    banco (pg_cron, migração 20261019_placon_recursos_checkpoint_cron.sql).
+    """
+    if "coordenador_compdec" not in _vinculos_do_usuario(db, user).values():
+        raise HTTPException(403, "Checkpoint restrito à coordenação da COMPDEC")
+
+    checkpoint_id = db.execute(
+        text("SELECT placon_gravar_checkpoint_recursos(:tenant_id)"),
+        {"tenant_id": user.tenant_id},
+    ).scalar()
     db.commit()
-    return {"ok": True, "alocado_plano": recurso.alocado_plano}
+    return {"ok": True, "checkpoint_id": checkpoint_id}
 
 
-@router.get("/publico")
-def get_plano_publico(tenant_id: UUID, db: Session = Depends(get_db)):
+@router.get("/recursos/{recurso_id}/historico")
+def get_historico_recurso(recurso_id: UUID, desde: Optional[datetime] = None,
+                          ate: Optional[datetime] = None,
+                          db: Session = Depends(get_db), user=Depends(get_current_user)):
     """
-    Visão de leitura pública/institucional — todos os órgãos e fases,
-    sem dados operacionais sensíveis do MCI. Usada na audiência pública
-    anual (prazo: 30/junho, conforme §6º Lei 12.608/2012).
+    Trilha de auditoria de um recurso, em ordem cronológica, opcionalmente
+    limitada a um intervalo. Servida pelo índice (tenant, recurso, created_at).
     """
+    orgao_id = db.query(models.PlaconRecurso.orgao_id)\
+                 .filter_by(id=recurso_id, tenant_id=user.tenant_id).scalar()
+    if orgao_id is None:
+        raise HTTPException(404, "Recurso não encontrado")
+    _exigir_acesso_orgao(db, user, orgao_id)
+
+    query = db.query(models.PlaconRecursoLog)\
+              .filter(models.PlaconRecursoLog.tenant_id == user.tenant_id,
+                      models.PlaconRecursoLog.recurso_id == recurso_id)
+    if desde is not None:
+        query = query.filter(models.PlaconRecursoLog.created_at >= desde)
+    if ate is not None:
+        query = query.filter(models.PlaconRecursoLog.created_at <= ate)
+    return query.order_by(models.PlaconRecursoLog.created_at).all()
+
+
+_SQL_BUSCA = text("""
+    WITH q AS (
+        -- termos em OU: perguntas em linguagem natural raramente batem todas as palavras
+        SELECT replace(plainto_tsquery('portuguese', unaccent(:termo))::text, '&', '|')::tsquery AS consulta
+    )
+    SELECT 'atribuicao' AS tipo, a.id, a.orgao_id, o.nome_curto, a.fase, a.texto AS trecho,
+           ts_rank(a.busca_vetor, q.consulta) AS relevancia
+      FROM placon_atribuicoes a JOIN placon_orgaos o ON o.id = a.orgao_id, q
+     WHERE a.tenant_id = :tenant_id AND o.ativo AND a.busca_vetor @@ q.consulta
+    UNION ALL
+    SELECT 'orgao', o.id, o.id, o.nome_curto, NULL, o.descricao,
+           ts_rank(o.busca_vetor, q.consulta)
+      FROM placon_orgaos o, q
+     WHERE o.tenant_id = :tenant_id AND o.ativo AND o.busca_vetor @@ q.consulta
+    UNION ALL
+    SELECT 'contato', c.id, c.orgao_id, o.nome_curto, NULL,
+           concat_ws(' — ', c.nome, c.cargo, c.telefone),  -- ignora NULLs (contato sem cargo)
+           ts_rank(c.busca_vetor, q.consulta)
+      FROM placon_contatos c JOIN placon_orgaos o ON o.id = c.orgao_id, q
+     WHERE c.tenant_id = :tenant_id AND o.ativo AND c.busca_vetor @@ q.consulta
+    ORDER BY relevancia DESC
+    LIMIT :limite
+""")
+
+
+@router.get("/busca")
+def buscar_plano(q: str = Query(..., min_length=2), limite: int = Query(20, ge=1, le=100),
+                 db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Busca textual no plano — atribuições, descrição dos órgãos e contatos
+    — para achar rapidamente "quem abre as escolas como abrigo" ou "quem
+    acionar para maquinário". Sem acento e com radicalização em português
+    (tsvector + índice GIN), resultados ordenados por relevância.
+    """
+    if not _vinculos_do_usuario(db, user):
+        raise HTTPException(403, "Usuário sem vínculo a órgão no PLACON")
+
+    linhas = db.execute(_SQL_BUSCA, {"termo": q, "tenant_id": user.tenant_id, "limite": limite}).all()
+    return [
+        {
+            "tipo": tipo, "id": id_, "orgao_id": orgao_id, "orgao": nome_curto,
+            "fase": fase, "trecho": trecho, "relevancia": round(float(relevancia), 4),
+        }
+        for tipo, id_, orgao_id, nome_curto, fase, trecho, relevancia in linhas
+    ]
+
+
+# ---------------------------------------------------------------------
+# Stream em tempo real (SSE) para os painéis de órgão
+# ---------------------------------------------------------------------
+STREAM_KEEPALIVE_S = 15
+
+
+@router.on_event("startup")
+def _iniciar_stream_placon():
+    barramento_placon.iniciar_listen(os.environ.get("DATABASE_URL"))
+
+
+@router.get("/stream")
+def stream_recursos(request: Request, db: Session = Depends(get_db),
+                    user=Depends(get_current_user)):
+    """
+    Server-Sent Events com as mudanças de disponibilidade no MCI e de
+    alocação no plano, apenas dos recursos dos órgãos do usuário (todos,
+    para coordenador_compdec): primeiro um `snapshot` com os valores
+    atuais, depois só valores que de fato mudaram — substitui o polling
+    de GET /orgaos/{id}. Se a conexão perder eventos, recebe
+    `ressincronizar` e o stream termina; o EventSource reconecta sozinho
+    e recebe outro snapshot.
+    """
+    vinculos = _vinculos_do_usuario(db, user)
+    if not vinculos:
+        raise HTTPException(404, "Usuário sem vínculo a órgão no PLACON")
+
+    query = db.query(models.PlaconRecurso.id, models.PlaconRecurso.mci_recurso_id,
+                     models.PlaconRecurso.alocado_plano,
+                     models.MciRecurso.quantidade_disponivel)\
+              .outerjoin(models.MciRecurso,
+                         models.MciRecurso.id == models.PlaconRecurso.mci_recurso_id)\
+              .filter(models.PlaconRecurso.tenant_id == user.tenant_id)
+    if "coordenador_compdec" not in vinculos.values():
+        query = query.filter(models.PlaconRecurso.orgao_id.in_(list(vinculos)))
+
+    tenant_id = str(user.tenant_id)
+    # Último valor enviado por chave — o cliente já tem o estado atual
+    ultimos = {}
+    recursos_por_mci = defaultdict(list)
+
+    def _ler_snapshot():
+        # Chamado pelo stream depois de assinar o barramento: um evento
+        # publicado durante a leitura fica na fila e não se perde
+        try:
+            linhas = query.all()
+        finally:
+            db.close()
+        for recurso_id, mci_recurso_id, alocado, disponivel in linhas:
+            ultimos[("alocado_plano", str(recurso_id))] = alocado
+            if mci_recurso_id:
+                recursos_por_mci[str(mci_recurso_id)].append(str(recurso_id))
+                ultimos[("disponivel_mci", str(mci_recurso_id))] = disponivel
+        return {
+            "tipo": "snapshot",
+            "alocado_plano": {k[1]: v for k, v in ultimos.items() if k[0] == "alocado_plano"},
+            "disponivel_mci": [
+                {"mci_recurso_id": mci_id, "recurso_ids": recursos_por_mci[mci_id],
+                 "valor": ultimos[("disponivel_mci", mci_id)]}
+                for mci_id in recursos_por_mci
+            ],
+        }
+
+    # A conexão SSE fica aberta; a sessão não precisa. Sem isso, o teardown
+    # do get_db só rodaria no fim do stream e cada painel aberto prenderia
+    # uma conexão do pool. O snapshot reabre a sessão só durante a leitura.
+    db.close()
+
+    def _filtrar(evento):
+        if evento.get("tipo") == "alocado_plano":
+            chave = ("alocado_plano", str(evento.get("recurso_id")))
+            if str(evento.get("tenant_id")) != tenant_id or chave not in ultimos:
+                return None
+            payload = {"tipo": "alocado_plano", "recurso_id": chave[1], "valor": evento["valor"]}
+        elif evento.get("tipo") == "disponivel_mci":
+            chave = ("disponivel_mci", str(evento.get("mci_recurso_id")))
+            if chave[1] not in recursos_por_mci:
+                return None
+            payload = {"tipo": "disponivel_mci", "recurso_ids": recursos_por_mci[chave[1]],
+                       "valor": evento["valor"]}
+        else:
+            return None
+        if ultimos.get(chave) == evento["valor"]:
+            return None
+        ultimos[chave] = evento["valor"]
+        return payload
+
+    async def _eventos():
+        assinante = barramento_placon.assinar()
+        _, fila = assinante
+        try:
+            snapshot = await run_in_threadpool(_ler_snapshot)
+            yield "retry: 5000\n\n"
+            yield f"event: snapshot\ndata: {json.dumps(snapshot, default=str)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if evento is RESSINCRONIZAR:
+                    yield "event: ressincronizar\ndata: {}\n\n"
+                    return
+                payload = _filtrar(evento)
+                if payload is not None:
+                    yield f"event: {payload['tipo']}\ndata: {json.dumps(payload, default=str)}\n\n"
+        finally:
+            barramento_placon.cancelar(assinante)
+
+    return StreamingResponse(_eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ---------------------------------------------------------------------
+# Cache da visão pública: tenant_id -> resposta já serializada e
+# comprimida, válida enquanto a última PlaconVersao do tenant não mudar.
+# Dentro da janela de revalidação o hit não consulta o banco; edições
+# commitadas neste processo invalidam a entrada na hora (ver listeners).
+# A rota é anônima e o tenant_id vem do cliente: só entram no cache
+# tenants com plano (versão ou órgão ativo), e o cache é um LRU limitado.
+# ---------------------------------------------------------------------
+PLANO_PUBLICO_REVALIDAR_S = 60
+PLANO_PUBLICO_MAX_TENANTS = 64
+
+_PLANO_PUBLICO_CACHE = OrderedDict()
+_PLANO_PUBLICO_LOCK = threading.Lock()
+
+
+def invalidar_cache_plano_publico(tenant_id=None):
+    """Descarta a visão pública em cache do tenant (ou de todos, se None)."""
+    with _PLANO_PUBLICO_LOCK:
+        if tenant_id is None:
+            _PLANO_PUBLICO_CACHE.clear()
+        else:
+            _PLANO_PUBLICO_CACHE.pop(str(tenant_id), None)
+
+
+def _guardar_plano_publico(chave: str, entrada: dict) -> None:
+    with _PLANO_PUBLICO_LOCK:
+        if entrada["vazio"]:
+            _PLANO_PUBLICO_CACHE.pop(chave, None)
+            return
+        _PLANO_PUBLICO_CACHE[chave] = entrada
+        _PLANO_PUBLICO_CACHE.move_to_end(chave)
+        while len(_PLANO_PUBLICO_CACHE) > PLANO_PUBLICO_MAX_TENANTS:
+            _PLANO_PUBLICO_CACHE.popitem(last=False)
+
+
+def _montar_plano_publico(db: Session, tenant_id: UUID) -> dict:
     orgaos = db.query(models.PlaconOrgao)\
                .filter_by(tenant_id=tenant_id, ativo=True)\
                .order_by(models.PlaconOrgao.ordem).all()
 
-    resultado = []
-    for orgao in orgaos:
+    # Atribuições e contatos de todos os órgãos em duas consultas
+    # (IN), agrupados em memória — custo constante por página, não por órgão
+    orgao_ids = [o.id for o in orgaos]
+    atribuicoes_por_orgao = defaultdict(list)
+    contatos_por_orgao = defaultdict(list)
+    if orgao_ids:
         atribuicoes = db.query(models.PlaconAtribuicao)\
-                        .filter_by(orgao_id=orgao.id, tenant_id=tenant_id)\
+                        .filter(models.PlaconAtribuicao.tenant_id == tenant_id,
+                                models.PlaconAtribuicao.orgao_id.in_(orgao_ids))\
                         .order_by(models.PlaconAtribuicao.fase,
                                   models.PlaconAtribuicao.ordem).all()
+        for a in atribuicoes:
+            atribuicoes_por_orgao[a.orgao_id].append(a)
+
         contatos = db.query(models.PlaconContato)\
-                     .filter_by(orgao_id=orgao.id, tenant_id=tenant_id).all()
-        resultado.append({
+                     .filter(models.PlaconContato.tenant_id == tenant_id,
+                             models.PlaconContato.orgao_id.in_(orgao_ids)).all()
+        for c in contatos:
+            contatos_por_orgao[c.orgao_id].append(c)
+
+    resultado = [
+        {
             "orgao": orgao,
-            "atribuicoes": atribuicoes,
-            "contatos": contatos,
+            "atribuicoes": atribuicoes_por_orgao[orgao.id],
+            "contatos": contatos_por_orgao[orgao.id],
             # Sem recursos nesta visão (dado operacional)
-        })
+        }
+        for orgao in orgaos
+    ]
 
     versao = db.query(models.PlaconVersao)\
                .filter_by(tenant_id=tenant_id)\
                .order_by(models.PlaconVersao.created_at.desc()).first()
 
     return {"versao": versao, "orgaos": resultado}
+
+
+def _serializar_plano_publico(db: Session, tenant_id: UUID) -> dict:
+    plano = _montar_plano_publico(db, tenant_id)
+    corpo = json.dumps(jsonable_encoder(plano), ensure_ascii=False).encode("utf-8")
+    digest = hashlib.sha256(corpo).hexdigest()[:32]
+    return {
+        "versao_id": plano["versao"].id if plano["versao"] else None,
+        "vazio": plano["versao"] is None and not plano["orgaos"],
+        "corpo": corpo,
+        "corpo_gzip": gzip.compress(corpo),
+        "etag": f'"{digest}"',
+        "etag_gzip": f'"{digest}-gz"',
+        "verificado_em": time.monotonic(),
+    }
+
+
+@router.get("/publico")
+def get_plano_publico(tenant_id: UUID, request: Request, db: Session = Depends(get_db)):
+    """
+    Visão de leitura pública/institucional — todos os órgãos e fases,
+    sem dados operacionais sensíveis do MCI. Usada na audiência pública
+    anual (prazo: 30/junho, conforme §6º Lei 12.608/2012).
+    Servida do cache por versão do plano, com ETag forte e gzip.
+    """
+    chave = str(tenant_id)
+    entrada = _PLANO_PUBLICO_CACHE.get(chave)
+    if entrada is None:
+        entrada = _serializar_plano_publico(db, tenant_id)
+    elif time.monotonic() - entrada["verificado_em"] > PLANO_PUBLICO_REVALIDAR_S:
+        # Revalidação barata: só o id da última versão do plano
+        versao_id = db.query(models.PlaconVersao.id)\
+                      .filter_by(tenant_id=tenant_id)\
+                      .order_by(models.PlaconVersao.created_at.desc())\
+                      .limit(1).scalar()
+        if versao_id != entrada["versao_id"]:
+            entrada = _serializar_plano_publico(db, tenant_id)
+        else:
+            entrada["verificado_em"] = time.monotonic()
+    _guardar_plano_publico(chave, entrada)
+
+    usa_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = entrada["etag_gzip"] if usa_gzip else entrada["etag"]
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "public, max-age=0, must-revalidate",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if usa_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entrada["corpo_gzip"], media_type="application/json", headers=headers)
+    return Response(entrada["corpo"], media_type="application/json", headers=headers)
+
+
+def _registrar_invalidacoes_placon():
+    """Invalida os caches deste módulo ao commitar alterações feitas por
+    qualquer rota deste processo: versões, órgãos, atribuições e contatos
+    (visão pública) e vínculos usuário <-> órgão."""
+    modelos_publicos = (models.PlaconVersao, models.PlaconOrgao,
+                        models.PlaconAtribuicao, models.PlaconContato)
+
+    @event.listens_for(Session, "after_flush")
+    def _marcar_alteracoes(session, flush_context):
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if isinstance(obj, modelos_publicos):
+                session.info.setdefault("placon_publico_alterado", set()).add(obj.tenant_id)
+            elif isinstance(obj, models.PlaconUsuarioOrgao):
+                session.info.setdefault("placon_vinculos_alterados", set()).add(
+                    (obj.tenant_id, obj.usuario_id))
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidar_alteracoes(session):
+        for tenant_id in session.info.pop("placon_publico_alterado", ()):
+            invalidar_cache_plano_publico(tenant_id)
+        for tenant_id, usuario_id in session.info.pop("placon_vinculos_alterados", ()):
+            invalidar_cache_vinculos(tenant_id, usuario_id)
+
+    @event.listens_for(Session, "after_rollback")
+    def _descartar_alteracoes(session):
+        session.info.pop("placon_publico_alterado", None)
+        session.info.pop("placon_vinculos_alterados", None)
+
+
+if models is not None:
+    _registrar_invalidacoes_placon()
@@ -0,0 +1,146 @@
+# api/utils/barramento_eventos.py
+"""
+Barramento genérico de eventos para os painéis em tempo real (SSE),
+alimentado por Postgres LISTEN/NOTIFY em um canal e por publicação local.
+
+Cada instância atende um canal (ver placon_eventos.py e, no módulo de
+abrigos, eventos_pontos_apoio.py): os eventos são dicts pequenos,
+entregues a todas as conexões abertas, cada uma com a sua fila no event
+loop do stream.
+
+Fontes dos eventos:
+- LISTEN no canal, numa thread por processo, quando DATABASE_URL e
+  psycopg2 estiverem disponíveis — pega alterações feitas por qualquer
+  processo, inclusive direto no Supabase. A thread nunca desiste: a cada
+  queda reconecta com backoff exponencial e refaz o LISTEN;
+- publicação local pelas rotas/serviços após o commit, como substituto
+  quando não há LISTEN.
+
+Os consumidores só repassam valores que mudaram, então um evento perdido
+deixaria o painel com valor velho para sempre. Quando a fila de uma
+conexão enche, ou quando o LISTEN reconecta (NOTIFYs da janela de queda
+se perderam), a conexão recebe RESSINCRONIZAR e deve encerrar o stream;
+o EventSource reconecta e recebe um snapshot novo.
+"""
+
+import asyncio
+import json
+import select
+import threading
+import time
+
+# Espera entre tentativas de reconexão do LISTEN (dobra a cada falha)
+LISTEN_BACKOFF_INICIAL_S = 1
+LISTEN_BACKOFF_MAX_S = 60
+# Sem NOTIFY por este tempo, um SELECT 1 confere se a conexão ainda vive
+LISTEN_VERIFICAR_S = 30
+TAMANHO_FILA = 1000
+
+# Marcador na fila: a conexão perdeu eventos e deve reabrir o stream
+RESSINCRONIZAR = {'tipo': '_ressincronizar'}
+
+
+class BarramentoNotify:
+    def __init__(self, canal, descricao, nome_thread):
+        """canal: canal do LISTEN/NOTIFY; descricao: complemento das
+        mensagens de aviso (ex.: 'do PLACON'); nome_thread: nome da thread
+        do LISTEN."""
+        self.canal = canal
+        self.descricao = descricao
+        self.nome_thread = nome_thread
+        self._assinantes = set()
+        self._lock = threading.Lock()
+        self._thread_listen = None
+
+    def assinar(self):
+        """Registra uma fila (no event loop corrente) que recebe todos os eventos."""
+        fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+        assinante = (asyncio.get_running_loop(), fila)
+        with self._lock:
+            self._assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def publicar(self, evento):
+        """Thread-safe: pode ser chamado do código síncrono ou da thread do LISTEN."""
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for loop, fila in assinantes:
+            try:
+                loop.call_soon_threadsafe(self._entregar, fila, evento)
+            except RuntimeError:
+                # loop já encerrado — a conexão será descartada no finally do stream
+                pass
+
+    def ressincronizar_todos(self):
+        """Todas as conexões abertas reabrem o stream (snapshot novo)."""
+        self.publicar(RESSINCRONIZAR)
+
+    @staticmethod
+    def _entregar(fila, evento):
+        if fila.full():
+            # cliente lento: descarta o atrasado e pede ressincronização —
+            # o marcador fica na frente e o stream termina ao lê-lo
+            while not fila.empty():
+                fila.get_nowait()
+            evento = RESSINCRONIZAR
+        fila.put_nowait(evento)
+
+    @property
+    def ouvindo_postgres(self):
+        return self._thread_listen is not None and self._thread_listen.is_alive()
+
+    def iniciar_listen(self, dsn):
+        """Inicia (uma vez) a thread que faz LISTEN no Postgres e repassa os NOTIFY."""
+        if self.ouvindo_postgres or not dsn:
+            return False
+        try:
+            import psycopg2
+            import psycopg2.extensions
+        except ImportError:
+            print(f"Aviso: psycopg2 indisponível, stream {self.descricao} usando apenas eventos locais.")
+            return False
+
+        def _loop_listen():
+            espera = LISTEN_BACKOFF_INICIAL_S
+            reconexao = False
+            while True:
+                conn = None
+                try:
+                    conn = psycopg2.connect(dsn)
+                    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                    cur = conn.cursor()
+                    cur.execute(f"LISTEN {self.canal};")
+                    espera = LISTEN_BACKOFF_INICIAL_S
+                    if reconexao:
+                        self.ressincronizar_todos()
+                    reconexao = True
+                    while True:
+                        if select.select([conn], [], [], LISTEN_VERIFICAR_S) == ([], [], []):
+                            # conexão caída sem aviso (rede, restart) só aparece ao usar
+                            cur.execute("SELECT 1")
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            try:
+                                self.publicar(json.loads(notify.payload))
+                            except ValueError:
+                                pass
+                except Exception as e:
+                    print(f"Aviso: LISTEN {self.descricao} caiu ({e}); nova tentativa em {espera}s.")
+                finally:
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except Exception:
+                            pass
+                time.sleep(espera)
+                espera = min(espera * 2, LISTEN_BACKOFF_MAX_S)
+
+        self._thread_listen = threading.Thread(target=_loop_listen, name=self.nome_thread, daemon=True)
+        self._thread_listen.start()
+        return True
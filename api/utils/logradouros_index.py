@@ -0,0 +1,177 @@
+# api/utils/logradouros_index.py
+"""
+Índice de logradouros oficiais do município (Santa Maria de Jetibá)
+para normalizar o endereço digitado nos PDFs importados (CIODES/e-COPS).
+
+O índice é montado uma única vez por processo a partir de
+archives/backups/Logradouros.json e fica residente em memória:
+os nomes são normalizados (sem acento, sem pontuação, sem o tipo do
+logradouro — "RUA", "AVENIDA", "ALAMEDA"...) e indexados por trigramas.
+A busca só pontua os logradouros que compartilham algum trigrama com o
+texto de entrada, então cada consulta custa microssegundos em vez de uma
+comparação aproximada contra a lista inteira. O tipo digitado não entra
+na comparação do nome, mas desempata homônimos (RUA x RODOVIA DALMÁCIO
+ESPÍNDULA) e, se divergir do tipo oficial, tira o casamento exato do 1.0.
+"""
+
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+
+LOGRADOUROS_JSON = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'archives', 'backups', 'Logradouros.json')
+
+# Tipos de logradouro (e abreviações usuais nos boletins) removidos do
+# início do nome antes da comparação
+TIPOS_LOGRADOURO = {
+    'RUA': 'RUA', 'R': 'RUA',
+    'AVENIDA': 'AVENIDA', 'AV': 'AVENIDA', 'AVEN': 'AVENIDA',
+    'ALAMEDA': 'ALAMEDA', 'AL': 'ALAMEDA',
+    'ESTRADA': 'ESTRADA', 'EST': 'ESTRADA', 'ESTR': 'ESTRADA',
+    'LADEIRA': 'LADEIRA', 'LAD': 'LADEIRA',
+    'RODOVIA': 'RODOVIA', 'ROD': 'RODOVIA',
+    'ESCADARIA': 'ESCADARIA', 'ESC': 'ESCADARIA',
+    'BECO': 'BECO', 'BC': 'BECO',
+    'TRAVESSA': 'TRAVESSA', 'TV': 'TRAVESSA', 'TRAV': 'TRAVESSA',
+    'PRACA': 'PRACA', 'PC': 'PRACA',
+}
+
+# Dice mínimo entre conjuntos de trigramas para aceitar a correspondência
+SCORE_MINIMO = 0.5
+# Score do nome idêntico quando o tipo digitado não é o tipo oficial
+# ("Beco da Paz" -> RUA DA PAZ)
+SCORE_EXATO_TIPO_DIVERGENTE = 0.9
+
+
+def separar_tipo_logradouro(texto):
+    """(tipo, nome): 'Av. Frederico Grulke' -> ('AVENIDA', 'FREDERICO GRULKE').
+    tipo é o primeiro tipo reconhecido no início do texto (forma canônica), ou None."""
+    if not texto:
+        return None, ''
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+    tokens = re.sub(r'[^A-Z0-9]+', ' ', texto).split()
+    tipo = None
+    while len(tokens) > 1 and tokens[0] in TIPOS_LOGRADOURO:
+        tipo = tipo or TIPOS_LOGRADOURO[tokens[0]]
+        tokens.pop(0)
+    return tipo, ' '.join(tokens)
+
+
+def normalizar_logradouro(texto):
+    """Remove acentos, pontuação e o tipo do logradouro: 'Av. Frederico Grulke' -> 'FREDERICO GRULKE'"""
+    return separar_tipo_logradouro(texto)[1]
+
+
+def _trigramas(nome):
+    padded = f"  {nome} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IndiceLogradouros:
+    """Índice invertido trigrama -> logradouros, com atalho para nome exato."""
+
+    def __init__(self, logradouros):
+        self._registros = {}
+        self._tipos = {}
+        self._por_nome = defaultdict(list)  # nome normalizado -> [ids] (homônimos de tipos diferentes)
+        self._tamanhos = {}
+        self._postings = defaultdict(list)
+
+        for item in logradouros:
+            tipo_nome, nome_norm = separar_tipo_logradouro(item['nome'])
+            if not nome_norm:
+                continue
+            tipo = separar_tipo_logradouro(f"{item['tipo']} X")[0] if item.get('tipo') else None
+            self._registros[item['id']] = item
+            self._tipos[item['id']] = tipo or tipo_nome
+            self._por_nome[nome_norm].append(item['id'])
+            grams = _trigramas(nome_norm)
+            self._tamanhos[item['id']] = len(grams)
+            for g in grams:
+                self._postings[g].append(item['id'])
+
+    def __len__(self):
+        return len(self._registros)
+
+    def buscar(self, texto, score_minimo=SCORE_MINIMO):
+        """
+        Retorna {'logradouro_id', 'nome', 'tipo', 'score'} do logradouro
+        oficial mais parecido com `texto`, ou None se nenhum atingir o score mínimo.
+        """
+        tipo, nome_norm = separar_tipo_logradouro(texto)
+        if not nome_norm:
+            return None
+
+        exatos = self._por_nome.get(nome_norm)
+        if exatos:
+            mesmo_tipo = [i for i in exatos if self._tipos[i] == tipo]
+            if mesmo_tipo or tipo is None:
+                return self._resultado((mesmo_tipo or exatos)[0], 1.0)
+            return self._resultado(exatos[0], SCORE_EXATO_TIPO_DIVERGENTE)
+
+        grams = _trigramas(nome_norm)
+        comuns = defaultdict(int)
+        for g in grams:
+            for logradouro_id in self._postings.get(g, ()):
+                comuns[logradouro_id] += 1
+
+        # mesmo score: prefere o logradouro do tipo digitado
+        melhor_id, melhor_chave = None, (0.0, False)
+        for logradouro_id, n in comuns.items():
+            score = 2.0 * n / (len(grams) + self._tamanhos[logradouro_id])
+            chave = (score, tipo is not None and self._tipos[logradouro_id] == tipo)
+            if chave > melhor_chave:
+                melhor_id, melhor_chave = logradouro_id, chave
+        melhor_score = melhor_chave[0]
+
+        if melhor_id is None or melhor_score < score_minimo:
+            return None
+        return self._resultado(melhor_id, round(melhor_score, 3))
+
+    def _resultado(self, logradouro_id, score):
+        item = self._registros[logradouro_id]
+        return {
+            'logradouro_id': logradouro_id,
+            'nome': item['nome'],
+            'tipo': item.get('tipo'),
+            'score': score,
+        }
+
+
+_INDICE = None
+
+
+def get_indice_logradouros():
+    """Carrega o índice na primeira chamada e o reutiliza nas seguintes (uma vez por processo).
+    Sem a base o importador não tem como casar endereços: falha em vez de
+    seguir com um índice vazio."""
+    global _INDICE
+    if _INDICE is None:
+        try:
+            with open(LOGRADOUROS_JSON, 'r', encoding='utf-8') as f:
+                logradouros = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Base de logradouros indisponível ({LOGRADOUROS_JSON}): {e}") from e
+        indice = IndiceLogradouros(logradouros)
+        if not len(indice):
+            raise RuntimeError(f"Base de logradouros vazia: {LOGRADOUROS_JSON}")
+        _INDICE = indice
+    return _INDICE
+
+
+def casar_logradouro(texto):
+    """
+    Casa o texto livre da rua com a base oficial. Retorna o resultado de
+    `IndiceLogradouros.buscar` acrescido de 'tempo_busca_us' (duração da
+    consulta em microssegundos), ou None se não houver correspondência.
+    """
+    indice = get_indice_logradouros()
+    inicio = time.perf_counter()
+    resultado = indice.buscar(texto)
+    if resultado is not None:
+        resultado['tempo_busca_us'] = round((time.perf_counter() - inicio) * 1_000_000, 1)
+    return resultado
@@ -0,0 +1,28 @@
+# api/utils/placon_eventos.py
+"""
+Barramento de eventos do PLACON para os painéis em tempo real (SSE).
+
+Cada alteração de disponibilidade no MCI ou de alocação no plano vira um
+evento pequeno ({"tipo", "recurso_id"/"mci_recurso_id", valor}) entregue
+a todas as conexões abertas, que filtram pelo(s) órgão(s) do usuário.
+
+Fontes dos eventos:
+- Postgres LISTEN/NOTIFY no canal 'placon_recursos' (triggers da migração
+  20261019_placon_stream_notify.sql), quando DATABASE_URL e psycopg2
+  estiverem disponíveis — pega alterações feitas por qualquer processo,
+  inclusive direto no Supabase;
+- publicação local pelas próprias rotas após o commit, como substituto
+  quando não há LISTEN (ex.: desenvolvimento, SQLite).
+As duas fontes podem coexistir: o consumidor só repassa valores que
+mudaram, então um evento duplicado não chega ao cliente.
+
+A entrega, o LISTEN com reconexão e o RESSINCRONIZAR (fila cheia ou
+LISTEN reconectado: o stream termina e o EventSource reabre com snapshot
+novo) ficam no barramento genérico, barramento_eventos.py.
+"""
+
+from api.utils.barramento_eventos import RESSINCRONIZAR, BarramentoNotify  # noqa: F401
+
+CANAL_NOTIFY = 'placon_recursos'
+
+barramento_placon = BarramentoNotify(CANAL_NOTIFY, 'do PLACON', 'placon-listen')
@@ -0,0 +1,162 @@
+# benchmark_pontos_apoio.py
+# Executar: python scripts/benchmark_pontos_apoio.py
+# Compara, para 10, 1k e 100k pontos de apoio sintéticos em torno de Santa
+# Maria de Jetibá, a sugestão atual (Haversine contra todos + ordenação)
+# com o índice espacial (k mais próximos com vaga, parada antecipada), e
+# o laço escalar de Haversine com a matriz M×N vetorizada (NumPy), e o
+# encaminhamento guloso animal a animal com a atribuição em lote.
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "Abrigo_animais_extracted"))
+from alocacao_pontos_apoio import atribuir_min_distancia  # noqa: E402
+from distancias import matriz_distancias_km, np  # noqa: E402
+from indice_pontos_apoio import IndicePontosApoio  # noqa: E402
+
+CENTRO = (-20.0253, -40.7461)
+K = 5
+CONSULTAS = 200
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 6371.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def gerar_pontos(n, rnd):
+    return [
+        (i, CENTRO[0] + rnd.uniform(-0.5, 0.5), CENTRO[1] + rnd.uniform(-0.5, 0.5), rnd.random() < 0.7)
+        for i in range(n)
+    ]
+
+
+def atual(pontos, lat, lon):
+    itens = [(haversine_km(lat, lon, plat, plon), pid) for pid, plat, plon, com_vaga in pontos if com_vaga]
+    itens.sort()
+    return [pid for _, pid in itens[:K]]
+
+
+def indexado(indice, com_vaga, lat, lon):
+    resultado = []
+    for pid, _ in indice.vizinhos(lat, lon):
+        if com_vaga[pid]:
+            resultado.append(pid)
+            if len(resultado) == K:
+                break
+    return resultado
+
+
+def guloso(candidatos, capacidades):
+    """Um animal por vez, cada um no ponto compatível mais próximo com vaga."""
+    vagas = list(capacidades)
+    atribuido = []
+    for cand in candidatos:
+        livres = [(d, k) for k, d in cand if vagas[k] > 0]
+        if livres:
+            _, k = min(livres)
+            vagas[k] -= 1
+            atribuido.append(k)
+        else:
+            atribuido.append(None)
+    return atribuido
+
+
+def benchmark_indice(rnd):
+    print(f"{'pontos':>8} {'construção':>12} {'atual/consulta':>16} {'índice/consulta':>16}")
+    for n in (10, 1_000, 100_000):
+        pontos = gerar_pontos(n, rnd)
+        com_vaga = {pid: v for pid, _, _, v in pontos}
+        consultas = [(CENTRO[0] + rnd.uniform(-0.5, 0.5), CENTRO[1] + rnd.uniform(-0.5, 0.5))
+                     for _ in range(CONSULTAS)]
+
+        t0 = time.perf_counter()
+        indice = IndicePontosApoio((pid, lat, lon) for pid, lat, lon, _ in pontos)
+        t_construcao = time.perf_counter() - t0
+
+        repeticoes = CONSULTAS if n <= 1_000 else 10
+        t0 = time.perf_counter()
+        for lat, lon in consultas[:repeticoes]:
+            esperado = atual(pontos, lat, lon)
+        t_atual = (time.perf_counter() - t0) / repeticoes
+
+        t0 = time.perf_counter()
+        for lat, lon in consultas:
+            obtido = indexado(indice, com_vaga, lat, lon)
+        t_indice = (time.perf_counter() - t0) / CONSULTAS
+
+        for lat, lon in consultas[:repeticoes]:
+            assert atual(pontos, lat, lon) == indexado(indice, com_vaga, lat, lon)
+
+        print(f"{n:>8} {t_construcao * 1e3:>10.1f}ms {t_atual * 1e6:>14.0f}us {t_indice * 1e6:>14.0f}us")
+
+
+
+def benchmark_matriz(rnd):
+    if np is None:
+        print("NumPy indisponível — benchmark da matriz vetorizada ignorado.")
+        return
+
+    print(f"{'animais x pontos':>18} {'laço escalar':>14} {'matriz NumPy':>14}")
+    for m, n in ((10, 10), (100, 1_000), (1_000, 1_000), (2_000, 5_000)):
+        origens = [(lat, lon) for _, lat, lon, _ in gerar_pontos(m, rnd)]
+        destinos = [(lat, lon) for _, lat, lon, _ in gerar_pontos(n, rnd)]
+
+        t0 = time.perf_counter()
+        escalar = [[haversine_km(la, lo, lb, lob) for lb, lob in destinos] for la, lo in origens]
+        t_escalar = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        vetorizada = matriz_distancias_km(origens, destinos)
+        t_vetorizada = time.perf_counter() - t0
+
+        assert np.allclose(vetorizada, escalar)
+        print(f"{f'{m} x {n}':>18} {t_escalar * 1e3:>12.1f}ms {t_vetorizada * 1e3:>12.1f}ms")
+
+
+
+def benchmark_lote(rnd):
+    print(f"{'animais x pontos':>18} {'tempo lote':>12} {'km guloso':>12} {'km lote':>12} {'atendidos g/l':>14}")
+    for m, n in ((1_000, 20), (3_000, 40), (5_000, 100)):
+        animais = [(lat, lon) for _, lat, lon, _ in gerar_pontos(m, rnd)]
+        pontos = [(lat, lon) for _, lat, lon, _ in gerar_pontos(n, rnd)]
+        capacidades = [rnd.randint(5, int(2 * m / n)) for _ in range(n)]
+        distancias = matriz_distancias_km(animais, pontos)
+        # ~20% dos pares incompatíveis (espécie/porte)
+        candidatos = [
+            [(k, float(distancias[i][k])) for k in range(n) if rnd.random() < 0.8] for i in range(m)
+        ]
+
+        t0 = time.perf_counter()
+        lote = atribuir_min_distancia(candidatos, capacidades)
+        t_lote = time.perf_counter() - t0
+        sequencial = guloso(candidatos, capacidades)
+
+        def total(atribuicao):
+            return sum(dict(c)[k] for c, k in zip(candidatos, atribuicao) if k is not None)
+
+        def atendidos(atribuicao):
+            return sum(k is not None for k in atribuicao)
+
+        assert atendidos(lote) >= atendidos(sequencial)
+        print(f"{f'{m} x {n}':>18} {t_lote:>11.2f}s {total(sequencial):>12.0f} {total(lote):>12.0f} "
+              f"{atendidos(sequencial):>5}/{atendidos(lote):<6}")
+
+
+def main():
+    rnd = random.Random(42)
+    benchmark_indice(rnd)
+    print()
+    benchmark_matriz(rnd)
+    print()
+    benchmark_lote(rnd)
+
+
+if __name__ == "__main__":
+    main()
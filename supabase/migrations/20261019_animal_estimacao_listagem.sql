@@ -0,0 +1,11 @@
+-- Migration: índice da listagem paginada de animais por abrigo
+-- (keyset em created_at, id). Cobre também a seleção do encaminhamento
+-- em lote, que filtrava só por abrigo_humano_id.
+BEGIN;
+
+DROP INDEX IF EXISTS idx_animal_estimacao_abrigo_ativo;
+CREATE INDEX IF NOT EXISTS idx_animal_estimacao_abrigo_listagem
+    ON animal_estimacao (abrigo_humano_id, created_at, id)
+    WHERE ativo;
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- Migration: updated_at de animal_estimacao reflete qualquer mudança nos
+-- campos usados pelo índice de reencontro (microchip, espécie, porte,
+-- sexo, descrição, abrigo, ativo) — inclusive edições feitas direto pelo
+-- app. O índice (API) usa (count dos ativos, max(updated_at)) como
+-- assinatura para saber quando se reconstruir.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION fn_touch_animal_estimacao() RETURNS TRIGGER AS $$
+BEGIN
+    IF (NEW.microchip_numero, NEW.especie, NEW.porte, NEW.sexo, NEW.nome, NEW.raca,
+        NEW.temperamento_observacoes, NEW.condicao_saude_observacoes, NEW.abrigo_humano_id, NEW.ativo)
+       IS DISTINCT FROM
+       (OLD.microchip_numero, OLD.especie, OLD.porte, OLD.sexo, OLD.nome, OLD.raca,
+        OLD.temperamento_observacoes, OLD.condicao_saude_observacoes, OLD.abrigo_humano_id, OLD.ativo) THEN
+        NEW.updated_at = now();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_touch_animal_estimacao ON animal_estimacao;
+CREATE TRIGGER trg_touch_animal_estimacao
+    BEFORE UPDATE ON animal_estimacao
+    FOR EACH ROW EXECUTE FUNCTION fn_touch_animal_estimacao();
+
+-- max(updated_at) da assinatura sem varrer a tabela
+CREATE INDEX IF NOT EXISTS idx_animal_estimacao_updated_at
+    ON animal_estimacao (updated_at);
+
+COMMIT;
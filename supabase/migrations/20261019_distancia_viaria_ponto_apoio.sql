@@ -0,0 +1,20 @@
+-- Migration: tabela pré-calculada de distâncias pela malha viária
+-- (origem × ponto de apoio animal), gravada por
+-- scripts/precalcular_distancias_viarias.py e lida inteira em memória
+-- pelo serviço de animais. Pares ausentes caem para o Haversine.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS distancia_viaria_ponto_apoio (
+    origem_tipo     VARCHAR(10) NOT NULL CHECK (origem_tipo IN ('abrigo', 'bairro')),
+    origem_id       TEXT NOT NULL,          -- id do abrigo (shelters) ou fid do bairro
+    ponto_apoio_id  UUID NOT NULL REFERENCES ponto_apoio_animal(id) ON DELETE CASCADE,
+    distancia_km    REAL NOT NULL,
+    calculado_em    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (origem_tipo, origem_id, ponto_apoio_id)
+);
+
+ALTER TABLE distancia_viaria_ponto_apoio ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow authenticated read access to distancia_viaria_ponto_apoio"
+    ON distancia_viaria_ponto_apoio FOR SELECT TO authenticated USING (true);
+
+COMMIT;
@@ -0,0 +1,31 @@
+-- Migration: outbox transacional das entradas automáticas do Diário Operacional.
+-- O serviço grava o evento aqui na mesma transação da confirmação (checklist
+-- da rotina do abrigo) e um worker do backend (diario_outbox.py) repassa os
+-- pendentes para registrar_diario em lotes, com nova tentativa e backoff —
+-- a confirmação não depende mais da escrita em operacao_diario.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS operacao_diario_outbox (
+  id                     UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  operacao_id            UUID         NOT NULL REFERENCES operacao_assistencia_humanitaria(id) ON DELETE CASCADE,
+  descricao              TEXT         NOT NULL,
+  origem                 VARCHAR(10)  NOT NULL DEFAULT 'automatico' CHECK (origem IN ('automatico','manual')),
+  entidade_referencia    VARCHAR(50),
+  entidade_referencia_id UUID,
+  criado_em              TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+  -- próxima tentativa; enquanto um worker processa o lote, fim da reserva
+  disponivel_em          TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+  tentativas             INTEGER      NOT NULL DEFAULT 0,
+  ultimo_erro            TEXT,
+  processado_em          TIMESTAMPTZ
+);
+
+-- Só os pendentes interessam ao worker
+CREATE INDEX IF NOT EXISTS idx_operacao_diario_outbox_pendente
+  ON operacao_diario_outbox (disponivel_em)
+  WHERE processado_em IS NULL;
+
+-- Sem policies: acesso só pelo backend (service role)
+ALTER TABLE operacao_diario_outbox ENABLE ROW LEVEL SECURITY;
+
+COMMIT;
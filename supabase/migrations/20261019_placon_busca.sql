@@ -0,0 +1,62 @@
+-- =====================================================================
+-- PLACON: busca textual (português, sem acento) em atribuições,
+-- descrição dos órgãos e contatos — GET /placon/busca.
+-- Mesmo padrão de vetor mantido por trigger usado no NORTIS.
+-- =====================================================================
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+ALTER TABLE placon_atribuicoes ADD COLUMN IF NOT EXISTS busca_vetor TSVECTOR;
+ALTER TABLE placon_orgaos      ADD COLUMN IF NOT EXISTS busca_vetor TSVECTOR;
+ALTER TABLE placon_contatos    ADD COLUMN IF NOT EXISTS busca_vetor TSVECTOR;
+
+CREATE OR REPLACE FUNCTION placon_atribuicoes_tsvector_update() RETURNS trigger AS $$
+BEGIN
+  NEW.busca_vetor :=
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.texto, ''))), 'A') ||
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.base_legal, ''))), 'C');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION placon_orgaos_tsvector_update() RETURNS trigger AS $$
+BEGIN
+  NEW.busca_vetor :=
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.nome_curto, '') || ' ' || coalesce(NEW.nome_completo, ''))), 'A') ||
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.descricao, ''))), 'B');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION placon_contatos_tsvector_update() RETURNS trigger AS $$
+BEGIN
+  NEW.busca_vetor :=
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.nome, ''))), 'A') ||
+    setweight(to_tsvector('portuguese', unaccent(coalesce(NEW.cargo, ''))), 'B') ||
+    setweight(to_tsvector('simple', coalesce(NEW.telefone, '') || ' ' || coalesce(NEW.email, '')), 'D');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_placon_atribuicoes_tsvector ON placon_atribuicoes;
+CREATE TRIGGER trg_placon_atribuicoes_tsvector
+BEFORE INSERT OR UPDATE ON placon_atribuicoes
+FOR EACH ROW EXECUTE FUNCTION placon_atribuicoes_tsvector_update();
+
+DROP TRIGGER IF EXISTS trg_placon_orgaos_tsvector ON placon_orgaos;
+CREATE TRIGGER trg_placon_orgaos_tsvector
+BEFORE INSERT OR UPDATE ON placon_orgaos
+FOR EACH ROW EXECUTE FUNCTION placon_orgaos_tsvector_update();
+
+DROP TRIGGER IF EXISTS trg_placon_contatos_tsvector ON placon_contatos;
+CREATE TRIGGER trg_placon_contatos_tsvector
+BEFORE INSERT OR UPDATE ON placon_contatos
+FOR EACH ROW EXECUTE FUNCTION placon_contatos_tsvector_update();
+
+-- Preenche o vetor das linhas já existentes (dispara os triggers acima)
+UPDATE placon_atribuicoes SET texto = texto;
+UPDATE placon_orgaos      SET descricao = descricao;
+UPDATE placon_contatos    SET nome = nome;
+
+CREATE INDEX IF NOT EXISTS idx_placon_atribuicoes_busca ON placon_atribuicoes USING GIN (busca_vetor);
+CREATE INDEX IF NOT EXISTS idx_placon_orgaos_busca      ON placon_orgaos      USING GIN (busca_vetor);
+CREATE INDEX IF NOT EXISTS idx_placon_contatos_busca    ON placon_contatos    USING GIN (busca_vetor);
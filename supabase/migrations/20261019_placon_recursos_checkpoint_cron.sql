@@ -0,0 +1,45 @@
+-- =====================================================================
+-- PLACON: checkpoints periódicos da alocação (ver
+-- 20261019_placon_recursos_historico.sql), agendados no próprio banco
+-- com pg_cron. Sem eles, a consulta histórica reaplica um trecho do log
+-- cada vez maior; com um checkpoint por hora, no máximo ~1 h de eventos.
+-- =====================================================================
+
+-- Um checkpoint por tenant que teve alocação desde o último checkpoint
+-- (tenant parado não ganha fotografias repetidas). Retorna quantos gravou.
+CREATE OR REPLACE FUNCTION placon_gravar_checkpoints_pendentes(
+    p_instante TIMESTAMPTZ DEFAULT NOW() - INTERVAL '5 minutes')
+RETURNS INTEGER AS $$
+DECLARE
+    v_tenant UUID;
+    v_total  INTEGER := 0;
+BEGIN
+    FOR v_tenant IN
+        SELECT DISTINCT l.tenant_id
+        FROM placon_recursos_log l
+        WHERE l.created_at <= p_instante
+          AND l.created_at > COALESCE(
+                (SELECT MAX(c.tomado_em) FROM placon_recursos_checkpoint c
+                 WHERE c.tenant_id = l.tenant_id),
+                '-infinity'::timestamptz)
+    LOOP
+        PERFORM placon_gravar_checkpoint_recursos(v_tenant, p_instante);
+        v_total := v_total + 1;
+    END LOOP;
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Agenda de hora em hora (cron.schedule com nome substitui o job existente).
+-- Sem pg_cron disponível, avisa: o checkpoint fica a cargo de
+-- POST /placon/recursos/historico/checkpoint por um agendador externo.
+DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_cron') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_cron;
+        PERFORM cron.schedule(
+            'placon-recursos-checkpoint', '7 * * * *',
+            'SELECT placon_gravar_checkpoints_pendentes()');
+    ELSE
+        RAISE NOTICE 'pg_cron indisponível: agende placon_gravar_checkpoints_pendentes() externamente';
+    END IF;
+END $$;
@@ -0,0 +1,70 @@
+-- =====================================================================
+-- PLACON: consulta histórica das alocações ("o que estava alocado às
+-- 03:00 durante a enchente?") sem reprocessar o log inteiro.
+--
+-- Estado num instante T = último checkpoint com tomado_em <= T
+--                         + eventos do log em (tomado_em, T].
+-- =====================================================================
+
+-- Índice do histórico por recurso (consulta por recurso e laterais abaixo)
+CREATE INDEX IF NOT EXISTS idx_placon_recursos_log_tenant_recurso_created
+    ON placon_recursos_log (tenant_id, recurso_id, created_at);
+
+-- Índice para o "tail" do log a partir de um checkpoint
+CREATE INDEX IF NOT EXISTS idx_placon_recursos_log_tenant_created
+    ON placon_recursos_log (tenant_id, created_at);
+
+-- Fotografias periódicas de alocado_plano de todos os recursos do tenant
+CREATE TABLE IF NOT EXISTS placon_recursos_checkpoint (
+    id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    tenant_id   UUID NOT NULL,
+    tomado_em   TIMESTAMPTZ NOT NULL,
+    estado      JSONB NOT NULL,          -- { "<recurso_id>": alocado_plano, ... }
+    created_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_placon_recursos_checkpoint_tenant_tomado
+    ON placon_recursos_checkpoint (tenant_id, tomado_em DESC);
+
+ALTER TABLE placon_recursos_checkpoint ENABLE ROW LEVEL SECURITY;
+
+DO $$ BEGIN
+    DROP POLICY IF EXISTS tenant_isolation ON placon_recursos_checkpoint;
+    CREATE POLICY tenant_isolation ON placon_recursos_checkpoint
+        USING (true) WITH CHECK (true);
+EXCEPTION WHEN OTHERS THEN NULL; END $$;
+
+-- Estado de todos os recursos num instante, derivado só do log: último
+-- alocado_depois até o instante; sem evento até lá, o alocado_antes do
+-- primeiro evento posterior; sem evento algum, o valor atual.
+-- Uma leitura indexada por recurso, nunca uma varredura do log.
+CREATE OR REPLACE FUNCTION placon_estado_recursos_em(p_tenant_id UUID, p_instante TIMESTAMPTZ)
+RETURNS JSONB AS $$
+    SELECT COALESCE(
+        jsonb_object_agg(r.id, COALESCE(ult.alocado_depois, prox.alocado_antes, r.alocado_plano)),
+        '{}'::jsonb)
+    FROM placon_recursos r
+    LEFT JOIN LATERAL (
+        SELECT l.alocado_depois FROM placon_recursos_log l
+        WHERE l.tenant_id = p_tenant_id AND l.recurso_id = r.id AND l.created_at <= p_instante
+        ORDER BY l.created_at DESC LIMIT 1
+    ) ult ON true
+    LEFT JOIN LATERAL (
+        SELECT l.alocado_antes FROM placon_recursos_log l
+        WHERE l.tenant_id = p_tenant_id AND l.recurso_id = r.id AND l.created_at > p_instante
+        ORDER BY l.created_at LIMIT 1
+    ) prox ON true
+    WHERE r.tenant_id = p_tenant_id AND r.created_at <= p_instante;
+$$ LANGUAGE sql STABLE;
+
+-- Grava um checkpoint. O instante padrão fica alguns minutos no passado
+-- para não perder alocações de transações ainda abertas (created_at do
+-- log é o início da transação). Agendar periodicamente (ex.: pg_cron ou
+-- POST /placon/recursos/historico/checkpoint a cada hora).
+CREATE OR REPLACE FUNCTION placon_gravar_checkpoint_recursos(
+    p_tenant_id UUID, p_instante TIMESTAMPTZ DEFAULT NOW() - INTERVAL '5 minutes')
+RETURNS UUID AS $$
+    INSERT INTO placon_recursos_checkpoint (tenant_id, tomado_em, estado)
+    VALUES (p_tenant_id, p_instante, placon_estado_recursos_em(p_tenant_id, p_instante))
+    RETURNING id;
+$$ LANGUAGE sql;
@@ -0,0 +1,43 @@
+-- =====================================================================
+-- PLACON: NOTIFY de disponibilidade (MCI) e alocação (plano) para o
+-- stream em tempo real dos painéis de órgão (GET /placon/stream).
+-- Canal: placon_recursos — payload JSON pequeno, só com o valor alterado.
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION fn_placon_notify_mci() RETURNS TRIGGER AS $$
+BEGIN
+    IF (to_jsonb(NEW) -> 'quantidade_disponivel') IS DISTINCT FROM (to_jsonb(OLD) -> 'quantidade_disponivel') THEN
+        PERFORM pg_notify('placon_recursos', json_build_object(
+            'tipo', 'disponivel_mci',
+            'mci_recurso_id', NEW.id,
+            'valor', to_jsonb(NEW) -> 'quantidade_disponivel'
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_placon_notify_mci ON mci_recursos;
+CREATE TRIGGER trg_placon_notify_mci
+    AFTER UPDATE ON mci_recursos
+    FOR EACH ROW EXECUTE FUNCTION fn_placon_notify_mci();
+
+CREATE OR REPLACE FUNCTION fn_placon_notify_alocacao() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.alocado_plano IS DISTINCT FROM OLD.alocado_plano THEN
+        PERFORM pg_notify('placon_recursos', json_build_object(
+            'tipo', 'alocado_plano',
+            'tenant_id', NEW.tenant_id,
+            'orgao_id', NEW.orgao_id,
+            'recurso_id', NEW.id,
+            'valor', NEW.alocado_plano
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_placon_notify_alocacao ON placon_recursos;
+CREATE TRIGGER trg_placon_notify_alocacao
+    AFTER UPDATE OF alocado_plano ON placon_recursos
+    FOR EACH ROW EXECUTE FUNCTION fn_placon_notify_alocacao();
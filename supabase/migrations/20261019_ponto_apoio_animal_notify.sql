@@ -0,0 +1,28 @@
+-- Migration: NOTIFY de ocupação dos pontos de apoio animal para o stream
+-- em tempo real do painel do abrigo (GET /api/pontos-apoio-animal/stream).
+-- Canal: ponto_apoio_ocupacao — payload JSON pequeno, só com o estado do ponto.
+-- Dispara para qualquer origem da mudança: trigger de encaminhamento
+-- (contador), edição de capacidade ou (in)ativação, inclusive pelo app.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION fn_ponto_apoio_notify_ocupacao() RETURNS TRIGGER AS $$
+BEGIN
+    IF (NEW.ocupacao_atual, NEW.capacidade_maxima, NEW.ativo)
+       IS DISTINCT FROM (OLD.ocupacao_atual, OLD.capacidade_maxima, OLD.ativo) THEN
+        PERFORM pg_notify('ponto_apoio_ocupacao', json_build_object(
+            'ponto_apoio_id', NEW.id,
+            'ocupacao_atual', NEW.ocupacao_atual,
+            'capacidade_maxima', NEW.capacidade_maxima,
+            'ativo', NEW.ativo
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_ponto_apoio_notify_ocupacao ON ponto_apoio_animal;
+CREATE TRIGGER trg_ponto_apoio_notify_ocupacao
+    AFTER UPDATE OF ocupacao_atual, capacidade_maxima, ativo ON ponto_apoio_animal
+    FOR EACH ROW EXECUTE FUNCTION fn_ponto_apoio_notify_ocupacao();
+
+COMMIT;
@@ -0,0 +1,58 @@
+-- Migration: contador de ocupação em ponto_apoio_animal
+-- Mantido por trigger em toda transição de animal_encaminhamento (API ou
+-- escrita direta pelo app), no mesmo padrão de update_shelter_occupancy.
+-- A conferência periódica com as linhas de origem fica a cargo de
+-- POST /api/pontos-apoio-animal/reconciliar-ocupacao.
+BEGIN;
+
+ALTER TABLE ponto_apoio_animal
+    ADD COLUMN IF NOT EXISTS ocupacao_atual INTEGER NOT NULL DEFAULT 0;
+
+-- Índice parcial para a contagem de referência (reconciliação)
+CREATE INDEX IF NOT EXISTS idx_animal_encaminhamento_ocupando
+    ON animal_encaminhamento (ponto_apoio_id)
+    WHERE ativo AND status IN ('encaminhado', 'no_local');
+
+CREATE OR REPLACE FUNCTION fn_encaminhamento_ocupa_vaga(p_ativo BOOLEAN, p_status status_encaminhamento_animal)
+RETURNS BOOLEAN AS $$
+    SELECT p_ativo AND p_status IN ('encaminhado', 'no_local');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION fn_atualizar_ocupacao_ponto_apoio()
+RETURNS TRIGGER AS $$
+DECLARE
+    ocupava BOOLEAN := TG_OP <> 'INSERT' AND fn_encaminhamento_ocupa_vaga(OLD.ativo, OLD.status);
+    ocupa   BOOLEAN := TG_OP <> 'DELETE' AND fn_encaminhamento_ocupa_vaga(NEW.ativo, NEW.status);
+BEGIN
+    -- Ex.: encaminhado -> no_local no mesmo ponto não altera a ocupação
+    IF ocupava AND ocupa AND OLD.ponto_apoio_id = NEW.ponto_apoio_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF ocupava THEN
+        UPDATE ponto_apoio_animal SET ocupacao_atual = ocupacao_atual - 1
+        WHERE id = OLD.ponto_apoio_id;
+    END IF;
+    IF ocupa THEN
+        UPDATE ponto_apoio_animal SET ocupacao_atual = ocupacao_atual + 1
+        WHERE id = NEW.ponto_apoio_id;
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_atualizar_ocupacao_ponto_apoio ON animal_encaminhamento;
+CREATE TRIGGER trigger_atualizar_ocupacao_ponto_apoio
+    AFTER INSERT OR UPDATE OR DELETE ON animal_encaminhamento
+    FOR EACH ROW
+    EXECUTE FUNCTION fn_atualizar_ocupacao_ponto_apoio();
+
+-- Carga inicial a partir dos encaminhamentos existentes
+UPDATE ponto_apoio_animal p
+SET ocupacao_atual = (
+    SELECT COUNT(*) FROM animal_encaminhamento e
+    WHERE e.ponto_apoio_id = p.id AND e.ativo AND e.status IN ('encaminhado', 'no_local')
+);
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- Migration: restrições de espécie/porte dos pontos de apoio animal e
+-- índices do encaminhamento em lote (evacuação em massa).
+-- NULL (ou lista vazia) = o ponto aceita qualquer espécie/porte.
+BEGIN;
+
+ALTER TABLE ponto_apoio_animal
+    ADD COLUMN IF NOT EXISTS especies_aceitas TEXT[] NULL,
+    ADD COLUMN IF NOT EXISTS portes_aceitos   TEXT[] NULL;
+
+-- Animais ativos de um abrigo (seleção do lote)
+CREATE INDEX IF NOT EXISTS idx_animal_estimacao_abrigo_ativo
+    ON animal_estimacao (abrigo_humano_id)
+    WHERE ativo;
+
+-- "Animal já tem encaminhamento ativo?" (exclusão do lote e transferência)
+CREATE INDEX IF NOT EXISTS idx_animal_encaminhamento_animal_ativo
+    ON animal_encaminhamento (animal_id)
+    WHERE ativo;
+
+COMMIT;
@@ -0,0 +1,25 @@
+-- Migration: updated_at de ponto_apoio_animal reflete mudanças de
+-- localização/estado do ponto (inclusive edições feitas direto pelo app).
+-- O índice espacial dos pontos (API) usa (count, max(updated_at)) como
+-- assinatura para saber quando se reconstruir; mudanças só de
+-- ocupacao_atual (trigger de encaminhamento) não devem invalidá-lo.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION fn_touch_ponto_apoio_animal() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.latitude IS DISTINCT FROM OLD.latitude
+       OR NEW.longitude IS DISTINCT FROM OLD.longitude
+       OR NEW.ativo IS DISTINCT FROM OLD.ativo
+       OR NEW.capacidade_maxima IS DISTINCT FROM OLD.capacidade_maxima THEN
+        NEW.updated_at = now();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_touch_ponto_apoio_animal ON ponto_apoio_animal;
+CREATE TRIGGER trg_touch_ponto_apoio_animal
+    BEFORE UPDATE ON ponto_apoio_animal
+    FOR EACH ROW EXECUTE FUNCTION fn_touch_ponto_apoio_animal();
+
+COMMIT;
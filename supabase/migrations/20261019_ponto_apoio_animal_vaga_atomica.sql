@@ -0,0 +1,51 @@
+-- Migration: reserva de vaga atômica nos pontos de apoio animal.
+-- O incremento do contador passa a ser condicional (só se ainda houver
+-- vaga), recusando no próprio banco qualquer encaminhamento que
+-- ultrapassaria capacidade_maxima — venha da API ou de escrita direta
+-- pelo app. E cada animal passa a ter no máximo um encaminhamento ativo.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION fn_atualizar_ocupacao_ponto_apoio()
+RETURNS TRIGGER AS $$
+DECLARE
+    ocupava BOOLEAN := TG_OP <> 'INSERT' AND fn_encaminhamento_ocupa_vaga(OLD.ativo, OLD.status);
+    ocupa   BOOLEAN := TG_OP <> 'DELETE' AND fn_encaminhamento_ocupa_vaga(NEW.ativo, NEW.status);
+BEGIN
+    -- Ex.: encaminhado -> no_local no mesmo ponto não altera a ocupação
+    IF ocupava AND ocupa AND OLD.ponto_apoio_id = NEW.ponto_apoio_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF ocupava THEN
+        UPDATE ponto_apoio_animal SET ocupacao_atual = ocupacao_atual - 1
+        WHERE id = OLD.ponto_apoio_id;
+    END IF;
+    IF ocupa THEN
+        UPDATE ponto_apoio_animal SET ocupacao_atual = ocupacao_atual + 1
+        WHERE id = NEW.ponto_apoio_id AND ocupacao_atual < capacidade_maxima;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Ponto de apoio % sem vagas', NEW.ponto_apoio_id
+                USING ERRCODE = 'check_violation';
+        END IF;
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Duplicatas pré-existentes: mantém ativo só o encaminhamento mais recente
+UPDATE animal_encaminhamento e
+SET ativo = false
+WHERE e.ativo AND EXISTS (
+    SELECT 1 FROM animal_encaminhamento mais_novo
+    WHERE mais_novo.animal_id = e.animal_id AND mais_novo.ativo
+      AND (mais_novo.data_encaminhamento, mais_novo.id) > (e.data_encaminhamento, e.id)
+);
+
+-- Substitui o índice parcial simples por um único
+DROP INDEX IF EXISTS idx_animal_encaminhamento_animal_ativo;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_animal_encaminhamento_animal_ativo
+    ON animal_encaminhamento (animal_id)
+    WHERE ativo;
+
+COMMIT;
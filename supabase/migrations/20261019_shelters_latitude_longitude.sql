@@ -0,0 +1,41 @@
+-- Migration: latitude/longitude numéricas em shelters, mapeadas pelo model
+-- Abrigo e lidas pelo serviço de animais (referência 'abrigo') e por
+-- scripts/precalcular_distancias_viarias.py. O app continua gravando
+-- `coordenadas` ("lat,lon" em texto); um trigger mantém as duas colunas
+-- em dia a partir dela.
+BEGIN;
+
+ALTER TABLE shelters
+    ADD COLUMN IF NOT EXISTS latitude  DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+CREATE OR REPLACE FUNCTION shelters_coordenadas_latlon()
+RETURNS TRIGGER AS $$
+DECLARE
+    partes TEXT[];
+BEGIN
+    partes := regexp_match(
+        COALESCE(NEW.coordenadas, ''),
+        '^\s*(-?\d+(?:\.\d+)?)\s*[,;]\s*(-?\d+(?:\.\d+)?)\s*$'
+    );
+    IF partes IS NOT NULL THEN
+        NEW.latitude  := partes[1]::DOUBLE PRECISION;
+        NEW.longitude := partes[2]::DOUBLE PRECISION;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- coordenadas apagadas ou ilegíveis: não deixa valor velho
+        NEW.latitude  := NULL;
+        NEW.longitude := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_shelters_coordenadas_latlon ON shelters;
+CREATE TRIGGER trg_shelters_coordenadas_latlon
+    BEFORE INSERT OR UPDATE OF coordenadas ON shelters
+    FOR EACH ROW EXECUTE FUNCTION shelters_coordenadas_latlon();
+
+-- Abrigos já cadastrados
+UPDATE shelters SET coordenadas = coordenadas WHERE coordenadas IS NOT NULL;
+
+COMMIT;